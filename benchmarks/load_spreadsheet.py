@@ -0,0 +1,114 @@
+"""Benchmark the loading of large gitmetrics spreadsheets.
+
+Creates a few workbooks shaped like the ones written by ``gitmetrics collect``
+and times loading them whole, as ``load_spreadsheet`` used to, against loading
+only the sheets and columns used by ``gitmetrics summarize``, with each of the
+available engines and with several worker processes.
+
+Run it with ``python benchmarks/load_spreadsheet.py``.
+"""
+
+import argparse
+import importlib.util
+import logging
+import pathlib
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from gitmetrics import output
+from gitmetrics.summarize import SUMMARY_COLUMNS
+
+LOGGER = logging.getLogger(__name__)
+
+
+def _make_sheets(rows, seed):
+    random = np.random.default_rng(seed)
+    dates = pd.Timestamp('2018-01-01') + pd.to_timedelta(random.integers(0, 2e8, rows), unit='s')
+    users = [f'user-{index}' for index in random.integers(0, rows // 4, rows)]
+    issues = pd.DataFrame({
+        'repository': 'owner/repository',
+        'number': np.arange(rows),
+        'user': users,
+        'title': 'An issue with a reasonably long title',
+        'state': random.choice(['OPEN', 'CLOSED'], rows),
+        'comments': random.integers(0, 50, rows),
+        'created_at': dates,
+        'updated_at': dates,
+        'closed_at': dates,
+        'user_created_at': dates,
+        'user_updated_at': dates,
+    })
+    unique_users = issues.drop_duplicates('user')[['user', 'created_at']]
+    unique_users = unique_users.rename(columns={'created_at': 'first_issue_date'})
+    return {
+        'Unique Issue Users': unique_users,
+        'Issues': issues,
+        'Pull Requests': issues.copy(),
+    }
+
+
+def _load_whole(spreadsheet):
+    """Load the spreadsheet the way ``load_spreadsheet`` used to."""
+    sheets = pd.read_excel(spreadsheet, sheet_name=None, engine='openpyxl')
+    for sheet in sheets.values():
+        for column in output.DATE_COLUMNS:
+            if column in sheet:
+                sheet[column] = pd.to_datetime(sheet[column], utc=True).dt.tz_convert(None)
+
+    return sheets
+
+
+def _time(name, function, *args, **kwargs):
+    start = time.perf_counter()
+    function(*args, **kwargs)
+    LOGGER.info('%-50s %8.2fs', name, time.perf_counter() - start)
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100_000, help='Issues per workbook.')
+    parser.add_argument('--workbooks', type=int, default=4, help='Number of workbooks.')
+    parser.add_argument('--workers', type=int, default=4, help='Processes for parallel loading.')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s', force=True)
+    logging.getLogger('gitmetrics').setLevel(logging.WARNING)
+
+    engines = ['openpyxl']
+    if importlib.util.find_spec('python_calamine'):
+        engines.append('calamine')
+
+    with tempfile.TemporaryDirectory() as folder:
+        spreadsheets = []
+        for index in range(args.workbooks):
+            spreadsheet = str(pathlib.Path(folder) / f'project-{index}')
+            output.create_spreadsheet(spreadsheet, _make_sheets(args.rows, index))
+            spreadsheets.append(spreadsheet)
+
+        LOGGER.info('%s workbooks with %s issues and pull requests each', args.workbooks, args.rows)
+        _time('whole workbooks, openpyxl', lambda: [_load_whole(f'{s}.xlsx') for s in spreadsheets])
+        for engine in engines:
+            output.ENGINE = engine
+            _time(
+                f'summarized sheets and columns, {engine}',
+                output.load_spreadsheets,
+                spreadsheets,
+                sheet_name=list(SUMMARY_COLUMNS),
+                usecols=SUMMARY_COLUMNS,
+            )
+
+        _time(
+            f'summarized sheets and columns, {output.ENGINE}, {args.workers} workers',
+            output.load_spreadsheets,
+            spreadsheets,
+            sheet_name=list(SUMMARY_COLUMNS),
+            usecols=SUMMARY_COLUMNS,
+            workers=args.workers,
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -10,7 +10,15 @@ import warnings
 import yaml
 
 from gitmetrics.consolidate import consolidate_metrics
-from gitmetrics.main import collect_projects, collect_traffic
+from gitmetrics.github import cache, checkpoint, retry, sharding, transport
+from gitmetrics.github.async_client import DEFAULT_CONCURRENCY
+from gitmetrics.main import (
+    DEFAULT_FULL_REFRESH_DAYS,
+    DEFAULT_UPLOAD_WORKERS,
+    collect_projects,
+    collect_traffic,
+)
+from gitmetrics.profiles import DEFAULT_MAX_AGE_DAYS, DEFAULT_MAX_REFRESH
 from gitmetrics.summarize import summarize_metrics
 
 LOGGER = logging.getLogger(__name__)
@@ -50,10 +58,32 @@ def _load_config(config_path):
     return config
 
 
+def _get_tokens(args):
+    tokens = args.token or os.getenv('GITHUB_TOKEN')
+    if tokens is None:
+        tokens = input('Please input your GitHub Token: ')
+
+    if isinstance(tokens, str):
+        tokens = tokens.split(',')
+
+    return [token.strip() for token in tokens if token.strip()]
+
+
+def _configure_client(args):
+    transport.configure(pool_size=args.pool_size)
+    retry.configure(max_attempts=args.max_attempts)
+    cache.configure(
+        directory=args.cache_dir,
+        ttl=args.cache_ttl * 60 * 60,
+        max_size=args.cache_max_size * 1024 * 1024,
+    )
+
+
 def _collect(args, parser):
-    token = args.token or os.getenv('GITHUB_TOKEN')
-    if token is None:
-        token = input('Please input your GitHub Token: ')
+    if args.resume and not args.checkpoint_dir:
+        parser.error('--resume requires a --checkpoint-dir to resume from.')
+
+    token = _get_tokens(args)
 
     config = _load_config(args.config_file)
     config_projects = config['projects']
@@ -78,6 +108,9 @@ def _collect(args, parser):
 
             projects[project] = config_projects[project]
 
+    _configure_client(args)
+    checkpoint.configure(directory=args.checkpoint_dir, resume=args.resume)
+    sharding.configure(max_shards=args.max_shards, shard_size=args.shard_size)
     collect_projects(
         token=token,
         projects=projects,
@@ -85,13 +118,19 @@ def _collect(args, parser):
         quiet=args.quiet,
         incremental=args.incremental,
         add_metrics=args.add_metrics,
+        concurrency=args.concurrency,
+        full_refresh_days=args.full_refresh_days,
+        profile_max_age_days=args.profile_max_age,
+        profile_max_refresh=args.profile_max_refresh,
+        skip_unchanged=args.skip_unchanged,
+        workers=args.workers,
+        upload_workers=args.upload_workers,
+        convert=args.convert,
     )
 
 
 def _traffic_collection(args, parser):
-    token = args.token or os.getenv('GITHUB_TOKEN')
-    if token is None:
-        token = input('Please input your GitHub Token: ')
+    token = _get_tokens(args)
 
     config = _load_config(args.config_file)
     config_projects = config['projects']
@@ -116,6 +155,7 @@ def _traffic_collection(args, parser):
 
             projects[project] = config_projects[project]
 
+    _configure_client(args)
     collect_traffic(
         token=token,
         projects=projects,
@@ -134,6 +174,7 @@ def _summarize(args, parser):
         input_folder=args.input_folder,
         dry_run=args.dry_run,
         verbose=args.verbose,
+        workers=args.workers,
     )
 
 
@@ -150,6 +191,38 @@ def _consolidate(args, parser):
 
 
 def _get_parser():
+    # GitHub client
+    client_args = argparse.ArgumentParser(add_help=False)
+    client_args.add_argument(
+        '--pool-size',
+        type=int,
+        default=transport.DEFAULT_POOL_SIZE,
+        help='Maximum number of HTTP connections kept open to the GitHub API.',
+    )
+    client_args.add_argument(
+        '--max-attempts',
+        type=int,
+        default=retry.DEFAULT_MAX_ATTEMPTS,
+        help='Maximum number of times a request that fails with a transient error is sent.',
+    )
+    client_args.add_argument(
+        '--cache-dir',
+        type=str,
+        help='If given, folder where the GitHub API responses are cached between runs.',
+    )
+    client_args.add_argument(
+        '--cache-ttl',
+        type=float,
+        default=cache.DEFAULT_TTL / 60 / 60,
+        help='Number of hours after which a cached response expires. Defaults to 24.',
+    )
+    client_args.add_argument(
+        '--cache-max-size',
+        type=int,
+        default=cache.DEFAULT_MAX_SIZE // 1024 // 1024,
+        help='Maximum size of the response cache, in MB. Defaults to 1024.',
+    )
+
     # Logging
     logging_args = argparse.ArgumentParser(add_help=False)
     logging_args.add_argument(
@@ -173,7 +246,9 @@ def _get_parser():
     action.required = True
 
     # Collect
-    collect = action.add_parser('collect', help='Collect github metrics.', parents=[logging_args])
+    collect = action.add_parser(
+        'collect', help='Collect github metrics.', parents=[logging_args, client_args]
+    )
     collect.set_defaults(action=_collect)
 
     collect.add_argument(
@@ -183,7 +258,14 @@ def _get_parser():
         required=True,
         help='Output folder path.',
     )
-    collect.add_argument('-t', '--token', type=str, required=False, help='GitHub Token to use.')
+    collect.add_argument(
+        '-t',
+        '--token',
+        type=str,
+        nargs='+',
+        required=False,
+        help='GitHub Token to use. If more than one is given, requests are rotated between them.',
+    )
     collect.add_argument(
         '-p',
         '--projects',
@@ -212,6 +294,80 @@ def _get_parser():
         action='store_false',
         help='Start from scratch instead of incrementing over existing data.',
     )
+    collect.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help='Number of processes used to write the spreadsheets of the projects in parallel.',
+    )
+    collect.add_argument(
+        '--upload-workers',
+        type=int,
+        default=DEFAULT_UPLOAD_WORKERS,
+        help='Number of projects uploaded to Google Drive at the same time. Defaults to 4.',
+    )
+    collect.add_argument(
+        '--no-convert',
+        dest='convert',
+        action='store_false',
+        help='Upload the spreadsheets to Google Drive as xlsx files, without converting them.',
+    )
+    collect.add_argument(
+        '--no-skip-unchanged',
+        dest='skip_unchanged',
+        action='store_false',
+        help='Collect all the repositories, even the ones that did not change since the last run.',
+    )
+    collect.add_argument(
+        '--concurrency',
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help='Maximum number of collections fetched from GitHub at the same time.',
+    )
+    collect.add_argument(
+        '--full-refresh-days',
+        type=float,
+        default=DEFAULT_FULL_REFRESH_DAYS,
+        help='Number of days after which all the stargazers are collected again. Defaults to 7.',
+    )
+    collect.add_argument(
+        '--profile-max-age',
+        type=float,
+        default=DEFAULT_MAX_AGE_DAYS,
+        help='Number of days after which a user profile is fetched again. Defaults to 30.',
+    )
+    collect.add_argument(
+        '--profile-max-refresh',
+        type=int,
+        default=DEFAULT_MAX_REFRESH,
+        help='Maximum number of stale user profiles fetched again per project.',
+    )
+    collect.add_argument(
+        '--max-shards',
+        type=int,
+        default=sharding.DEFAULT_MAX_SHARDS,
+        help=(
+            'Maximum number of shards of the largest collections. Stargazers use two at most. '
+            'Sharded issues and pull requests may miss the most recent ones.'
+        ),
+    )
+    collect.add_argument(
+        '--shard-size',
+        type=int,
+        default=sharding.DEFAULT_SHARD_SIZE,
+        help='Number of elements per shard. Smaller collections are fetched with a single cursor.',
+    )
+    collect.add_argument(
+        '--checkpoint-dir',
+        type=str,
+        help='If given, folder where the pagination progress is periodically checkpointed.',
+    )
+    collect.add_argument(
+        '--resume',
+        action='store_true',
+        help='Continue the collections interrupted in a previous run from their checkpoints.',
+    )
+
     # Consolidate
     consolidate = action.add_parser(
         'consolidate', help='Consolidate github metrics', parents=[logging_args]
@@ -240,11 +396,18 @@ def _get_parser():
 
     # Traffic
     traffic = action.add_parser(
-        'traffic', help='Collect github traffic metrics.', parents=[logging_args]
+        'traffic', help='Collect github traffic metrics.', parents=[logging_args, client_args]
     )
     traffic.set_defaults(action=_traffic_collection)
 
-    traffic.add_argument('-t', '--token', type=str, required=False, help='GitHub Token to use.')
+    traffic.add_argument(
+        '-t',
+        '--token',
+        type=str,
+        nargs='+',
+        required=False,
+        help='GitHub Token to use. If more than one is given, requests are rotated between them.',
+    )
     traffic.add_argument(
         '-c',
         '--config-file',
@@ -289,6 +452,12 @@ def _get_parser():
         action='store_true',
         help='Do not actually create the summary results file. Just calculate them.',
     )
+    summarize.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help='Number of processes used to load the spreadsheets of the projects in parallel.',
+    )
     return parser
 
 
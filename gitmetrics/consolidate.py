@@ -12,6 +12,7 @@ from gitmetrics.constants import (
     METRICS_SHEET_NAME,
     VALUE_COLUMN_NAME,
 )
+from gitmetrics.manifest import load_manifest
 from gitmetrics.output import create_spreadsheet, load_spreadsheet
 
 OUTPUT_FILENAME = 'Consolidated_Overview'
@@ -23,6 +24,10 @@ LOGGER = logging.getLogger(__name__)
 def consolidate_metrics(projects, output_folder, dry_run=False, verbose=True):
     """Consolidate GitHub Metrics from multiple spreadsheets on Google Drive.
 
+    The metrics of each project are read from the manifest stored next to its
+    spreadsheet, falling back to the ``Metrics`` sheet of the spreadsheet when
+    the manifest is missing or outdated.
+
     Args:
         projects (list[str]):
             List of projects/ecosysems to consolidate. The project must
@@ -43,7 +48,16 @@ def consolidate_metrics(projects, output_folder, dry_run=False, verbose=True):
     for project in tqdm(projects):
         row_info = {ECOSYSTEM_COLUMN_NAME: project}
         filepath = os.path.join(output_folder, project)
-        df = load_spreadsheet(filepath, sheet_name=METRICS_SHEET_NAME)
+        manifest = load_manifest(filepath)
+        if manifest is not None:
+            df = pd.DataFrame(manifest['metrics'], columns=[METRIC_COLUMN_NAME, VALUE_COLUMN_NAME])
+        else:
+            df = load_spreadsheet(
+                filepath,
+                sheet_name=METRICS_SHEET_NAME,
+                usecols=[METRIC_COLUMN_NAME, VALUE_COLUMN_NAME],
+            )
+
         row = df[[METRIC_COLUMN_NAME, VALUE_COLUMN_NAME]].T
         row = row.reset_index(drop=True)
 
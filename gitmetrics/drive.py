@@ -1,22 +1,45 @@
-"""Functions to upload to and download from google drive."""
+"""Functions to upload to and download from google drive.
 
+The user is authenticated once per process, and each thread gets its own
+client built from those credentials, as the clients are not thread-safe. The
+listing of each folder is fetched once and kept as an index of its files by
+title, shared by all the threads, which is updated as files are created. This
+way finding, uploading or downloading a file only needs the API call that
+transfers it.
+
+Uploaded files are tagged with the hash of their content, and uploading the
+same content again to a file is skipped.
+"""
+
+import io
 import json
 import logging
 import os
 import pathlib
 import tempfile
+import threading
 
 import yaml
 from pydrive.auth import GoogleAuth
 from pydrive.drive import GoogleDrive
 
+from gitmetrics.utils import get_content_hash
+
 XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
 SPREADSHEET_MIMETYPE = 'application/vnd.google-apps.spreadsheet'
+FOLDER_MIMETYPE = 'application/vnd.google-apps.folder'
 PYDRIVE_CREDENTIALS = 'PYDRIVE_CREDENTIALS'
+CONTENT_HASH_PROPERTY = 'gitmetricsContentHash'
 
 LOGGER = logging.getLogger(__name__)
 GDRIVE_LINK = 'gdrive://'
 
+_LOCK = threading.RLock()
+_CLIENT = None
+_AUTH = None
+_THREAD_CLIENTS = threading.local()
+_FOLDERS = {}
+
 
 def is_drive_path(path):
     """Tell if the drive is a Google Drive path or not."""
@@ -30,7 +53,7 @@ def split_drive_path(path):
     return folder, filename
 
 
-def _get_drive_client():
+def _authenticate():
     tmp_credentials = os.getenv(PYDRIVE_CREDENTIALS)
     if not tmp_credentials:
         gauth = GoogleAuth()
@@ -59,22 +82,154 @@ def _get_drive_client():
             gauth = GoogleAuth(str(settings_file))
             gauth.LocalWebserverAuth()
 
-    return GoogleDrive(gauth)
+    return gauth
+
+
+def _make_client(gauth):
+    """Make a client with its own HTTP connection and service, sharing the credentials."""
+    thread_auth = GoogleAuth(http_timeout=gauth.http_timeout)
+    thread_auth.settings = gauth.settings
+    thread_auth.client_config = gauth.client_config
+    thread_auth.credentials = gauth.credentials
+    thread_auth.Authorize()
+    return GoogleDrive(thread_auth)
+
+
+def configure(client=None):
+    """Configure the Google Drive clients.
+
+    Any previously created clients and folder listings are discarded, and the
+    user is authenticated again lazily on the next call that needs it.
+
+    Args:
+        client (pydrive.drive.GoogleDrive):
+            If given, client used by all the threads instead of authenticating,
+            such as one backed by a fake Google Drive. It must be thread-safe.
+    """
+    global _CLIENT, _AUTH, _THREAD_CLIENTS
+
+    with _LOCK:
+        _CLIENT = client
+        _AUTH = None
+        _THREAD_CLIENTS = threading.local()
+        _FOLDERS.clear()
+
+
+def _reset_lock():
+    """Replace the lock inherited by a forked process, which may be held by a parent thread."""
+    global _LOCK
+
+    _LOCK = threading.RLock()
+
+
+os.register_at_fork(after_in_child=_reset_lock)
+
+
+def _get_drive_client():
+    """Get the client of the current thread, authenticating the user on first use."""
+    global _AUTH
+
+    if _CLIENT is not None:
+        return _CLIENT
+
+    thread_clients = _THREAD_CLIENTS
+    client = getattr(thread_clients, 'client', None)
+    if client is None:
+        with _LOCK:
+            if _AUTH is None:
+                LOGGER.debug('Authenticating Google Drive client')
+                _AUTH = _authenticate()
+
+            gauth = _AUTH
+
+        client = _make_client(gauth)
+        thread_clients.client = client
+
+    return client
+
+
+def _get_folder_index(drive, folder):
+    """Get the files of the folder by their title, listing the folder on first use."""
+    with _LOCK:
+        index = _FOLDERS.get(folder)
+        if index is None:
+            query = {'q': f"'{folder}' in parents and trashed=false"}
+            index = {}
+            for found_file in drive.ListFile(query).GetList():
+                # Keep the first file with each title, as the listing order does
+                index.setdefault(found_file['title'], found_file)
+
+            _FOLDERS[folder] = index
+
+        return index
 
 
 def _find_file(drive, filename, folder):
-    query = {'q': f"'{folder}' in parents and trashed=false"}
-    files = drive.ListFile(query).GetList()
-    for found_file in files:
-        if filename == found_file['title']:
-            return found_file
+    found_file = _get_folder_index(drive, folder).get(filename)
+    if found_file is None:
+        raise FileNotFoundError(f"File '{filename}' not found in Google Drive folder {folder}")
+
+    # The file may have been listed by the client of another thread
+    found_file.auth = drive.auth
+    return found_file
+
+
+def _add_file(drive, drive_file, folder):
+    with _LOCK:
+        _get_folder_index(drive, folder)[drive_file['title']] = drive_file
+
+
+def _release_content(drive_file):
+    """Drop the content of a file kept in a folder index, so that it is not kept in memory."""
+    content = drive_file.content
+    drive_file.content = None
+    drive_file.dirty['content'] = False
+    return content
 
-    raise FileNotFoundError(f"File '{filename}' not found in Google Drive folder {folder}")
 
+def _get_content_hash(drive_file):
+    for file_property in drive_file.get('properties', []):
+        if file_property['key'] == CONTENT_HASH_PROPERTY:
+            return file_property['value']
 
-def upload_spreadsheet(content, filename, folder):
+    return None
+
+
+def _upload(content, filename, folder, convert):
+    drive = _get_drive_client()
+    content_hash = get_content_hash(content.getvalue())
+    file_config = {'title': filename, 'parents': [{'id': folder}]}
+
+    try:
+        drive_file = _find_file(drive, filename, folder)
+    except FileNotFoundError:
+        drive_file = drive.CreateFile(file_config)
+    else:
+        is_converted = drive_file['mimeType'] == SPREADSHEET_MIMETYPE
+        if is_converted != convert:
+            # A Google Sheet cannot be updated with unconverted content, nor the other way around
+            LOGGER.info('Replacing file %s', drive_file['alternateLink'])
+            drive_file.Trash()
+            drive_file = drive.CreateFile(file_config)
+        elif _get_content_hash(drive_file) == content_hash:
+            LOGGER.info('File %s is unchanged, skipping upload', drive_file['alternateLink'])
+            return
+
+    drive_file['properties'] = [
+        {'key': CONTENT_HASH_PROPERTY, 'value': content_hash, 'visibility': 'PRIVATE'}
+    ]
+    drive_file.content = content
+    drive_file.Upload({'convert': convert})
+    _release_content(drive_file)
+    _add_file(drive, drive_file, folder)
+    LOGGER.info('Created file %s', drive_file.metadata['alternateLink'])
+
+
+def upload_spreadsheet(content, filename, folder, convert=True):
     """Upload spredsheet to google drive.
 
+    The upload is skipped if the spreadsheet already has the same content.
+
     Args:
         content (BytesIO):
             Content of the spredsheet, passed as a BytesIO object.
@@ -82,18 +237,28 @@ def upload_spreadsheet(content, filename, folder):
             Name of the spreadsheet to create.
         folder (str):
             Id of the Google Drive Folder where the spreadshee must be created.
+        convert (bool):
+            Whether to convert the spreadsheet to a Google Sheet, which is
+            slow for big spreadsheets. Otherwise, it is stored as an ``xlsx``
+            file. Defaults to True.
     """
-    drive = _get_drive_client()
+    _upload(content, filename, folder, convert=convert)
 
-    try:
-        drive_file = _find_file(drive, filename, folder)
-    except FileNotFoundError:
-        file_config = {'title': filename, 'parents': [{'id': folder}]}
-        drive_file = drive.CreateFile(file_config)
 
-    drive_file.content = content
-    drive_file.Upload({'convert': True})
-    LOGGER.info('Created file %s', drive_file.metadata['alternateLink'])
+def upload_file(content, filename, folder):
+    """Upload a file to google drive as is, without converting it.
+
+    The upload is skipped if the file already has the same content.
+
+    Args:
+        content (bytes):
+            Content of the file.
+        filename (str):
+            Name of the file to create.
+        folder (str):
+            Id of the Google Drive Folder where the file must be created.
+    """
+    _upload(io.BytesIO(content), filename, folder, convert=False)
 
 
 def download_spreadsheet(folder, filename):
@@ -118,7 +283,52 @@ def download_spreadsheet(folder, filename):
 
     drive_file = _find_file(drive, filename, folder)
     drive_file.FetchContent(mimetype=XLSX_MIMETYPE)
-    return drive_file.content
+    return _release_content(drive_file)
+
+
+def download_file(folder, filename):
+    """Download a file uploaded with ``upload_file`` from google drive.
+
+    Args:
+        folder (str):
+            Id of the Google Drive Folder where the file is stored.
+        filename (str):
+            Name of the file.
+
+    Returns:
+        BytesIO:
+            BytesIO object with the contents of the file.
+
+    Raises:
+        FileNotFoundError:
+            If the file does not exist in the indicated folder.
+    """
+    drive = _get_drive_client()
+
+    drive_file = _find_file(drive, filename, folder)
+    drive_file.FetchContent()
+    return _release_content(drive_file)
+
+
+def get_uploaded_hash(folder, filename):
+    """Get the hash of the content last uploaded to a file.
+
+    Args:
+        folder (str):
+            Id of the Google Drive Folder where the file is stored.
+        filename (str):
+            Name of the file.
+
+    Returns:
+        str or None:
+            SHA-256 hash of the content, or None if the file was not uploaded
+            by gitmetrics.
+
+    Raises:
+        FileNotFoundError:
+            If the file does not exist in the indicated folder.
+    """
+    return _get_content_hash(_find_file(_get_drive_client(), filename, folder))
 
 
 def get_or_create_gdrive_folder(parent_folder: str, folder_name: str) -> str:
@@ -140,22 +350,19 @@ def get_or_create_gdrive_folder(parent_folder: str, folder_name: str) -> str:
     if parent_folder.startswith(GDRIVE_LINK):
         parent_folder = parent_folder.replace(GDRIVE_LINK, '')
 
-    query = {
-        'q': f"title = '{folder_name}' and mimeType = 'application/vnd.google-apps.folder' "
-        f"and '{parent_folder}' in parents and trashed = false"
-    }
-    folders = drive.ListFile(query).GetList()
-
-    if folders:
-        return folders[0]['id']  # Return existing folder ID
-
-    # Create folder if it does not exist
-    folder_metadata = {
-        'title': folder_name,
-        'mimeType': 'application/vnd.google-apps.folder',
-        'parents': [{'id': parent_folder}],
-    }
-    folder = drive.CreateFile(folder_metadata)
-    folder.Upload()
+    with _LOCK:
+        found_folder = _get_folder_index(drive, parent_folder).get(folder_name)
+        if found_folder is not None and found_folder['mimeType'] == FOLDER_MIMETYPE:
+            return found_folder['id']  # Return existing folder ID
+
+        # Create folder if it does not exist
+        folder_metadata = {
+            'title': folder_name,
+            'mimeType': FOLDER_MIMETYPE,
+            'parents': [{'id': parent_folder}],
+        }
+        folder = drive.CreateFile(folder_metadata)
+        folder.Upload()
+        _add_file(drive, folder, parent_folder)
 
     return folder['id']
@@ -0,0 +1,151 @@
+"""Asyncio variants of the GitHub clients.
+
+The blocking clients are executed inside a thread pool so that many queries can
+be waiting on the network at the same time, while an ``asyncio.Semaphore``
+bounds how many of them are in flight.
+"""
+
+import asyncio
+import functools
+
+from gitmetrics.github.batch import BatchRepositoryClient
+from gitmetrics.github.repository import RepositoryClient
+
+DEFAULT_CONCURRENCY = 8
+
+
+class AsyncGQLClient:
+    """Asyncio wrapper around a ``GQLClient``.
+
+    Args:
+        client (GQLClient):
+            Blocking client to wrap.
+        semaphore (asyncio.Semaphore):
+            Semaphore that limits the number of concurrent requests. Usually
+            shared by all the clients of a run.
+        executor (concurrent.futures.Executor):
+            Executor in which the blocking calls are run. If not given, the
+            default executor of the event loop is used.
+    """
+
+    def __init__(self, client, semaphore, executor=None):
+        self._client = client
+        self._semaphore = semaphore
+        self._executor = executor
+
+    async def _call(self, method, *args, **kwargs):
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            function = functools.partial(method, *args, **kwargs)
+            return await loop.run_in_executor(self._executor, function)
+
+    async def run_query(self, query, query_maker=None, prefix=None, **kwargs):
+        """Execute the given query. See ``GQLClient.run_query``."""
+        return await self._call(self._client.run_query, query, query_maker, prefix, **kwargs)
+
+    async def paginate_collection(self, *args, **kwargs):
+        """Paginate the given collection. See ``GQLClient.paginate_collection``."""
+        return await self._call(self._client.paginate_collection, *args, **kwargs)
+
+
+class AsyncRepositoryClient(AsyncGQLClient):
+    """Asyncio wrapper around a ``RepositoryClient``.
+
+    Args:
+        token (str):
+            GitHub token to use.
+        repo (str):
+            Repository, passed as ``{owner}/{name}``.
+        quiet (bool):
+            If True, disable the tqdm bars.
+        semaphore (asyncio.Semaphore):
+            Semaphore that limits the number of concurrent requests.
+        executor (concurrent.futures.Executor):
+            Executor in which the blocking calls are run.
+    """
+
+    def __init__(self, token, repo, quiet, semaphore, executor=None):
+        self.repo = repo
+        client = RepositoryClient(token, repo, quiet)
+        super().__init__(client, semaphore, executor)
+
+    async def _get_collection(self, collection, method, since=None, first_page=None):
+        """Get a collection, fetching its shards concurrently if it is sharded.
+
+        Each shard is a separate call, so the shards share the semaphore, and
+        the executor, with every other query of the run.
+        """
+        first_page, shards = await self._call(
+            self._client.get_shards, collection, since, first_page
+        )
+        if not shards:
+            return await self._call(method, since=since, first_page=first_page)
+
+        frames = await asyncio.gather(*[
+            self._call(self._client.get_shard, collection, shard, since, first_page)
+            for shard in shards
+        ])
+        return self._client.merge_shards(collection, frames)
+
+    async def get_stargazers(self, since=None, first_page=None):
+        """Get the stargazers of this repository."""
+        return await self._get_collection(
+            'stargazers', self._client.get_stargazers, since, first_page
+        )
+
+    async def get_issues(self, since=None, first_page=None):
+        """Get the issues of this repository."""
+        return await self._get_collection('issues', self._client.get_issues, since, first_page)
+
+    async def get_pull_requests(self, since=None, first_page=None):
+        """Get the pull requests of this repository."""
+        return await self._get_collection(
+            'pullRequests', self._client.get_pull_requests, since, first_page
+        )
+
+    async def get_updated_pull_requests(self, updated_after, first_page=None):
+        """Get the pull requests of this repository updated since the given date."""
+        return await self._call(
+            self._client.get_updated_pull_requests, updated_after, first_page=first_page
+        )
+
+    async def get_new_stargazers(self, starred_after, first_page=None):
+        """Get the stargazers that starred this repository since the given date."""
+        return await self._call(
+            self._client.get_new_stargazers, starred_after, first_page=first_page
+        )
+
+
+class AsyncBatchRepositoryClient(AsyncGQLClient):
+    """Asyncio wrapper around a ``BatchRepositoryClient``.
+
+    Args:
+        token (str):
+            GitHub token to use.
+        repositories (list[str]):
+            Repositories to query, passed as ``{owner}/{name}``.
+        quiet (bool):
+            If True, disable the tqdm bars.
+        semaphore (asyncio.Semaphore):
+            Semaphore that limits the number of concurrent requests.
+        executor (concurrent.futures.Executor):
+            Executor in which the blocking calls are run.
+    """
+
+    def __init__(self, token, repositories, quiet, semaphore, executor=None):
+        client = BatchRepositoryClient(token, repositories, quiet)
+        super().__init__(client, semaphore, executor)
+
+    async def get_counts(self):
+        """Get the counts of each repository. See ``BatchRepositoryClient.get_counts``."""
+        return await self._call(self._client.get_counts)
+
+    async def get_first_pages(self, collection, since=None, repositories=None, direction=None):
+        """Get the first page of a collection. See ``BatchRepositoryClient.get_first_pages``."""
+        return await self._call(
+            self._client.get_first_pages,
+            collection,
+            since=since,
+            repositories=repositories,
+            direction=direction,
+        )
@@ -0,0 +1,197 @@
+"""GQLClient subclass that batches queries for many repositories using aliases."""
+
+import logging
+
+import pandas as pd
+
+from gitmetrics.github.client import GQLClient, get_keypath
+from gitmetrics.github.repository import (
+    COLLECTIONS,
+    ISSUES_COUNT,
+    PROBE,
+    PROBE_COLUMNS,
+    PROBE_FIELDS,
+    PULL_REQUESTS_COUNT,
+    STARGAZERS_COUNT,
+    RepositoryClient,
+)
+
+LOGGER = logging.getLogger(__name__)
+
+BATCH_ENVELOPE = """
+{{
+{repositories}
+}}
+"""
+ALIASED_REPOSITORY = """
+    {alias}: repository(owner: "{owner}", name: "{name}") {{
+        {query_body}
+    }}
+"""
+COUNTS_COLUMNS = [
+    'repository',
+    'issues',
+    'pull_requests',
+    'stargazers',
+]
+DEFAULT_BATCH_SIZE = 10
+
+
+class BatchRepositoryClient(GQLClient):
+    """GQLClient subclass that batches queries for many repositories using aliases.
+
+    Each repository is queried under its own alias, so that the first page
+    of a collection, or the counts, of up to ``batch_size`` repositories are
+    fetched with a single request. Only the repositories that have more pages
+    need to be paginated afterwards.
+
+    Args:
+        token (str, list[str] or TokenPool):
+            GitHub token to use.
+        repositories (list[str]):
+            Repositories to query, passed as ``{owner}/{name}``.
+        quiet (bool):
+            If True, disable the tqdm bars.
+        batch_size (int):
+            Maximum number of repositories included in each request.
+            Defaults to 10.
+    """
+
+    def __init__(self, token, repositories, quiet, batch_size=DEFAULT_BATCH_SIZE):
+        self.repositories = list(repositories)
+        self.batch_size = batch_size
+        super().__init__(token, quiet)
+
+    @staticmethod
+    def _make_batch_query(query_bodies):
+        repositories = []
+        for index, (repository, query_body) in enumerate(query_bodies.items()):
+            owner, name = repository.split('/')
+            aliased = ALIASED_REPOSITORY.format(
+                alias=f'repository_{index}', owner=owner, name=name, query_body=query_body
+            )
+            repositories.append(aliased[1:-1])
+
+        return BATCH_ENVELOPE.format(repositories='\n'.join(repositories))[1:-1]
+
+    def _run_batch(self, batch, query_bodies, responses):
+        query = self._make_batch_query({
+            repository: query_bodies[repository] for repository in batch
+        })
+        try:
+            response = self._run_query(query, prefix='data')
+        except ValueError as error:
+            if len(batch) == 1:
+                LOGGER.warning('Query for %s failed: %s', batch[0], error)
+                return
+
+            # A single missing or renamed repository fails the whole request,
+            # so retry one at a time to keep the results of the others.
+            LOGGER.warning('Batch query for %s repositories failed: %s', len(batch), error)
+            for repository in batch:
+                self._run_batch([repository], query_bodies, responses)
+
+            return
+
+        for alias_index, repository in enumerate(batch):
+            body = response[f'repository_{alias_index}']
+            if body is not None:
+                responses[repository] = body
+
+    def _run_batches(self, query_bodies):
+        """Run the given query bodies in batches and return the body of each repository."""
+        responses = {}
+        repositories = list(query_bodies)
+        for index in range(0, len(repositories), self.batch_size):
+            batch = repositories[index : index + self.batch_size]
+            self._run_batch(batch, query_bodies, responses)
+
+        return responses
+
+    def get_counts(self):
+        """Get the number of issues, pull requests and stargazers of each repository.
+
+        Returns:
+            pandas.DataFrame:
+                Table with one row per repository and the ``issues``,
+                ``pull_requests`` and ``stargazers`` counts.
+        """
+        query_body = '\n'.join(
+            RepositoryClient._make_query_body(query)
+            for query in (ISSUES_COUNT, PULL_REQUESTS_COUNT, STARGAZERS_COUNT)
+        )
+        query_bodies = dict.fromkeys(self.repositories, query_body)
+        responses = self._run_batches(query_bodies)
+
+        counts = [
+            {
+                'repository': repository,
+                'issues': get_keypath(body, 'issues.totalCount'),
+                'pull_requests': get_keypath(body, 'pullRequests.totalCount'),
+                'stargazers': body[STARGAZERS_COUNT],
+            }
+            for repository, body in responses.items()
+        ]
+        return pd.DataFrame(counts, columns=COUNTS_COLUMNS)
+
+    def get_probes(self):
+        """Get the values that tell whether each repository changed since the last run.
+
+        The probe of a repository is made of its ``updated_at`` and ``pushed_at``
+        dates, the number of issues, pull requests and stargazers, and the last
+        date in which any of its issues or pull requests was updated.
+
+        Returns:
+            pandas.DataFrame:
+                Table with one row per repository and the ``PROBE_COLUMNS``.
+        """
+        query_body = RepositoryClient._make_query_body(PROBE)
+        responses = self._run_batches(dict.fromkeys(self.repositories, query_body))
+        probes = [
+            dict(
+                {'repository': repository},
+                **{column: get_keypath(body, keypath) for column, keypath in PROBE_FIELDS.items()},
+            )
+            for repository, body in responses.items()
+        ]
+        return pd.DataFrame(probes, columns=['repository'] + PROBE_COLUMNS)
+
+    def get_first_pages(self, collection, since=None, repositories=None, direction=None):
+        """Get the first page of the given collection for each repository.
+
+        Args:
+            collection (str):
+                Name of the collection: ``issues``, ``pullRequests`` or
+                ``stargazers``.
+            since (datetime or dict[str, datetime]):
+                ``since`` filter to apply, either to all the repositories or
+                to each one of them, passed as a dict.
+            repositories (list[str]):
+                If given, only get the first page of these repositories.
+                Defaults to all the repositories of this client.
+            direction (str):
+                If given, order the collection in this direction, ``ASC`` or
+                ``DESC``. Only supported by the collections that accept an
+                ``orderBy`` argument.
+
+        Returns:
+            dict[str, dict]:
+                Repository body of the first page of each repository, to be
+                passed as the ``first_page`` of the ``RepositoryClient`` methods.
+                Repositories whose query failed are not included.
+        """
+        query_bodies = {}
+        order_by = RepositoryClient._make_order_by(collection, direction)
+        for repository in self.repositories if repositories is None else repositories:
+            repository_since = since.get(repository) if isinstance(since, dict) else since
+            query_bodies[repository] = RepositoryClient._make_query_body(
+                COLLECTIONS[collection], since=repository_since, end_cursor='', order_by=order_by
+            )
+
+        if not query_bodies:
+            return {}
+
+        LOGGER.info(
+            'Collecting first page of %s for %s repositories', collection, len(query_bodies)
+        )
+        return self._run_batches(query_bodies)
@@ -0,0 +1,190 @@
+"""Persistent on-disk cache of the GitHub API responses.
+
+Responses are stored as gzip compressed JSON files, keyed by the normalized
+query text (or URL) and the identity of the tokens used to fetch them. Entries
+expire after a TTL, and the least recently used ones are evicted once the cache
+grows beyond its maximum size.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import tempfile
+import threading
+import time
+
+from gitmetrics.utils import normalize_query
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_TTL = 24 * 60 * 60
+DEFAULT_MAX_SIZE = 1024 * 1024 * 1024
+EVICTION_RATIO = 0.9
+
+
+class ResponseCache:
+    """Thread-safe on-disk cache of API responses.
+
+    Args:
+        directory (str or pathlib.Path):
+            Folder where the cached responses are stored.
+        ttl (int):
+            Number of seconds after which a cached response expires.
+            Defaults to one day.
+        max_size (int):
+            Maximum size of the cache, in bytes. Defaults to 1GB.
+    """
+
+    def __init__(self, directory, ttl=DEFAULT_TTL, max_size=DEFAULT_MAX_SIZE):
+        self.directory = pathlib.Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._size = sum(path.stat().st_size for path in self._get_paths())
+
+    @staticmethod
+    def get_key(*parts):
+        """Build the key of an entry from the given strings.
+
+        Whitespace outside of the string literals is normalized, so that the
+        same query formatted differently is mapped to the same key.
+        """
+        normalized = '\n'.join(normalize_query(part) for part in parts)
+        return hashlib.sha256(normalized.encode()).hexdigest()
+
+    def _get_path(self, key):
+        return self.directory / key[:2] / f'{key}.json.gz'
+
+    def _get_paths(self):
+        return self.directory.glob('*/*.json.gz')
+
+    def get(self, key):
+        """Get the response stored under the given key.
+
+        Returns:
+            dict or None:
+                The cached response, or None if it is missing or has expired.
+        """
+        path = self._get_path(key)
+        try:
+            entry = json.loads(gzip.decompress(path.read_bytes()))
+        except (OSError, ValueError):
+            entry = None
+
+        if entry is not None and time.time() - entry['created'] > self.ttl:
+            entry = None
+
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+
+        os.utime(path)
+        return entry['response']
+
+    def set(self, key, response):
+        """Store the given response under the given key."""
+        path = self._get_path(key)
+        path.parent.mkdir(exist_ok=True)
+        entry = {'created': time.time(), 'response': response}
+        content = gzip.compress(json.dumps(entry).encode())
+
+        with tempfile.NamedTemporaryFile(dir=path.parent, delete=False) as tmp_file:
+            tmp_file.write(content)
+
+        try:
+            previous_size = path.stat().st_size
+        except OSError:
+            previous_size = 0
+
+        os.replace(tmp_file.name, path)
+        with self._lock:
+            self.writes += 1
+            self._size += len(content) - previous_size
+            if self._size > self.max_size:
+                self._evict()
+
+    def _evict(self):
+        """Remove the least recently used entries until the cache fits in its size."""
+        entries = []
+        for path in self._get_paths():
+            stat = path.stat()
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        target = self.max_size * EVICTION_RATIO
+        self._size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if self._size <= target:
+                break
+
+            path.unlink(missing_ok=True)
+            self._size -= size
+            self.evictions += 1
+
+    def get_stats(self):
+        """Get the hit and miss statistics of the cache.
+
+        Returns:
+            dict:
+                Number of ``hits``, ``misses``, ``writes`` and ``evictions``,
+                the ``hit_rate`` and the current ``size`` in bytes.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'writes': self.writes,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else None,
+                'size': self._size,
+            }
+
+
+_CACHE = None
+
+
+def configure(directory=None, ttl=DEFAULT_TTL, max_size=DEFAULT_MAX_SIZE):
+    """Enable or disable the response cache used by all the clients.
+
+    Args:
+        directory (str or pathlib.Path):
+            Folder where the cached responses are stored. If None, the
+            cache is disabled.
+        ttl (int):
+            Number of seconds after which a cached response expires.
+        max_size (int):
+            Maximum size of the cache, in bytes.
+    """
+    global _CACHE
+
+    _CACHE = ResponseCache(directory, ttl, max_size) if directory else None
+
+
+def get_cache():
+    """Get the response cache used by all the clients, or None if it is disabled."""
+    return _CACHE
+
+
+def log_stats():
+    """Log the statistics of the response cache, if it is enabled."""
+    if _CACHE is not None:
+        stats = _CACHE.get_stats()
+        LOGGER.info(
+            'Response cache: %s hits, %s misses, %s writes, %s evictions, %s bytes',
+            stats['hits'],
+            stats['misses'],
+            stats['writes'],
+            stats['evictions'],
+            stats['size'],
+        )
@@ -0,0 +1,141 @@
+"""Checkpoints of the collections being paginated, so interrupted runs can be resumed.
+
+While a collection is paginated, its end cursor and the rows collected so far
+are periodically stored as a gzip compressed JSON file. If the run dies, the
+next one can be started in resume mode to continue from the last checkpoint
+instead of from the first page. Checkpoints are removed once their collection
+has been fully collected.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import tempfile
+
+from gitmetrics.utils import normalize_query
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL = 10
+
+
+class CheckpointStore:
+    """Local storage of pagination checkpoints.
+
+    Args:
+        directory (str or pathlib.Path):
+            Folder where the checkpoints are stored.
+        resume (bool):
+            If True, continue paginating from the existing checkpoints.
+            Otherwise they are ignored and overwritten. Defaults to False.
+        interval (int):
+            Number of pages collected between checkpoints. Defaults to 10.
+    """
+
+    def __init__(self, directory, resume=False, interval=DEFAULT_INTERVAL):
+        self.directory = pathlib.Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.resume = resume
+        self.interval = interval
+
+    @staticmethod
+    def get_signature(query):
+        """Get the signature of the first page query of a collection.
+
+        A checkpoint is only resumed if it was saved for the same query, so
+        changing the filters of a collection invalidates its checkpoint.
+        """
+        return hashlib.sha256(normalize_query(query).encode()).hexdigest()
+
+    def _get_path(self, name):
+        return self.directory / f'{name.replace("/", "--")}.json.gz'
+
+    def load(self, name, signature):
+        """Load the checkpoint of the given collection.
+
+        Args:
+            name (str):
+                Name of the checkpoint, usually ``{owner}/{name}/{collection}``.
+            signature (str):
+                Signature of the query being paginated.
+
+        Returns:
+            dict or None:
+                The ``end_cursor``, ``pages`` and ``data`` collected so far, or
+                None if not resuming or there is no valid checkpoint.
+        """
+        if not self.resume:
+            return None
+
+        try:
+            state = json.loads(gzip.decompress(self._get_path(name).read_bytes()))
+        except (OSError, ValueError):
+            return None
+
+        if state['signature'] != signature:
+            LOGGER.info('Ignoring checkpoint of %s made for a different query', name)
+            return None
+
+        LOGGER.info('Resuming %s from page %s', name, state['pages'])
+        return state
+
+    def save(self, name, signature, end_cursor, pages, data):
+        """Store the progress of the given collection.
+
+        Args:
+            name (str):
+                Name of the checkpoint.
+            signature (str):
+                Signature of the query being paginated.
+            end_cursor (str):
+                Cursor argument of the next page to query.
+            pages (int):
+                Number of pages collected so far.
+            data (dict[str, list]):
+                Values collected so far, by column.
+        """
+        state = {
+            'signature': signature,
+            'end_cursor': end_cursor,
+            'pages': pages,
+            'data': data,
+        }
+        path = self._get_path(name)
+        content = gzip.compress(json.dumps(state).encode())
+        with tempfile.NamedTemporaryFile(dir=self.directory, delete=False) as tmp_file:
+            tmp_file.write(content)
+
+        os.replace(tmp_file.name, path)
+        LOGGER.debug('Saved checkpoint of %s at page %s', name, pages)
+
+    def remove(self, name):
+        """Remove the checkpoint of the given collection, if any."""
+        self._get_path(name).unlink(missing_ok=True)
+
+
+_CHECKPOINTS = None
+
+
+def configure(directory=None, resume=False, interval=DEFAULT_INTERVAL):
+    """Enable or disable the pagination checkpoints used by all the clients.
+
+    Args:
+        directory (str or pathlib.Path):
+            Folder where the checkpoints are stored. If None, checkpoints
+            are disabled.
+        resume (bool):
+            If True, continue paginating from the existing checkpoints.
+        interval (int):
+            Number of pages collected between checkpoints.
+    """
+    global _CHECKPOINTS
+
+    _CHECKPOINTS = CheckpointStore(directory, resume, interval) if directory else None
+
+
+def get_checkpoints():
+    """Get the checkpoint store used by all the clients, or None if it is disabled."""
+    return _CHECKPOINTS
@@ -1,54 +1,177 @@
 """GraphQL client that handles requests and collection pagination."""
 
+import itertools
+import json
 import logging
-import time
-from datetime import datetime
 
 import pandas as pd
-import requests
 from benedict import benedict
 from tqdm.auto import tqdm
 
+from gitmetrics.github.cache import get_cache
+from gitmetrics.github.checkpoint import get_checkpoints
+from gitmetrics.github.rate_limit import add_rate_limit
+from gitmetrics.github.retry import get_policy
+from gitmetrics.github.tokens import TokenPool
+from gitmetrics.github.transport import get_session
+from gitmetrics.utils import to_utc
+
 LOGGER = logging.getLogger(__name__)
 
 
 GRAPHQL_URL = 'https://api.github.com/graphql'
-RATE_LIMIT_QUERY = """
-query {
-  rateLimit {
-    limit
-    cost
-    remaining
-    resetAt
-  }
-}
-"""
-ISO_DATETIME = '%Y-%m-%dT%H:%M:%SZ'
+DEFAULT_CHUNK_SIZE = 100
+
+
+def _get_path(data, keys):
+    for key in keys:
+        if data is None:
+            return None
+
+        if isinstance(data, list):
+            index = int(key)
+            data = data[index] if index < len(data) else None
+        else:
+            data = data[key]
+
+    return data
+
+
+def get_keypath(data, keypath):
+    """Get the value found at the given keypath of a plain JSON dict.
+
+    Args:
+        data (dict):
+            JSON dict to traverse.
+        keypath (str):
+            Keys to follow, separated by dots. Numeric keys index lists.
+
+    Returns:
+        object:
+            The value found, or None if any of its parents is None or
+            is a list that is too short.
+
+    Raises:
+        KeyError:
+            If any of the keys does not exist.
+    """
+    return _get_path(data, keypath.split('.'))
+
+
+def _get_collection(response, collection_name):
+    if collection_name:
+        return get_keypath(response, collection_name)
+
+    return response
+
+
+def _make_end_cursor(page_info):
+    return f', after: "{page_info["endCursor"]}"'
+
+
+def _make_frame(data, columns, datetime_columns):
+    data = pd.DataFrame(data, columns=columns)
+    for column in datetime_columns or []:
+        data[column] = to_utc(data[column])
+
+    return data
 
 
 class GQLClient:
     """Generic GitHub API v4 client that handles pagination.
 
     Args:
-        token (str):
-            GitHub token to use.
+        token (str, list[str] or TokenPool):
+            GitHub token to use, or pool of tokens to rotate between.
+        quiet (bool):
+            If True, disable the tqdm bars.
+        session (requests.Session):
+            Session to send the requests with. Defaults to the shared
+            session of ``gitmetrics.github.transport``.
     """
 
-    def __init__(self, token, quiet):
+    def __init__(self, token, quiet, session=None):
         self.token = token
+        self.tokens = TokenPool.from_tokens(token)
         self.quiet = quiet
+        self.session = session or get_session()
 
     def _post_query(self, query):
-        response = requests.post(
-            GRAPHQL_URL,
-            json={'query': query},
-            headers={'Authorization': f'token {self.token}'},
-        )
+        budget = None
+
+        def request():
+            nonlocal budget
+            token, budget = self.tokens.acquire()
+            response = self.session.post(
+                GRAPHQL_URL,
+                json={'query': query},
+                headers={'Authorization': f'token {token}'},
+            )
+            budget.update_from_headers(response.headers)
+            return response
 
+        response = get_policy().send(request)
         if response.status_code != 200:
             raise RuntimeError(f'Query fail ({response.status_code}): {response.content}')
 
-        return benedict(response.json())
+        response = response.json()
+        rate_limit = (response.get('data') or {}).get('rateLimit')
+        if rate_limit:
+            budget.update_from_rate_limit(rate_limit)
+        elif 'errors' in response and response['errors'][0].get('type') == 'RATE_LIMITED':
+            budget.exhaust()
+
+        return response
+
+    def _send_query(self, query):
+        query = add_rate_limit(query)
+        LOGGER.debug(query)
+
+        response = self._post_query(query)
+
+        if 'errors' in response:
+            first_error = response['errors'][0]
+            if first_error.get('type') == 'RATE_LIMITED':
+                LOGGER.warning('Rate Limit Hit!')
+                response = self._post_query(query)
+
+        if 'errors' in response:
+            LOGGER.error(json.dumps(response, indent=4))
+            raise ValueError(response['errors'][0]['message'])
+
+        return response
+
+    @staticmethod
+    def _format_query(query, query_maker=None, **kwargs):
+        if query_maker:
+            return query_maker(query, **kwargs)
+
+        if kwargs:
+            return query.format(**kwargs)
+
+        return query
+
+    def _run_query(self, query, query_maker=None, prefix=None, **kwargs):
+        """Execute the given query and return the plain JSON body found at the prefix key."""
+        query = self._format_query(query, query_maker, **kwargs)
+        cache = get_cache()
+        response = None
+        if cache is not None:
+            cache_key = cache.get_key('graphql', query, self.tokens.identity)
+            response = cache.get(cache_key)
+
+        if response is None:
+            response = self._send_query(query)
+            if cache is not None:
+                cache.set(cache_key, response)
+
+        if LOGGER.isEnabledFor(logging.DEBUG):
+            LOGGER.debug(json.dumps(response, indent=4))
+
+        if prefix:
+            return get_keypath(response, prefix)
+
+        return response
 
     def run_query(self, query, query_maker=None, prefix=None, **kwargs):
         """Execute the given query and extract the body from the prefix key.
@@ -72,50 +195,120 @@ class GQLClient:
             RuntimeError:
                 If the HTTP request failed.
         """
-        if query_maker:
-            query = query_maker(query, **kwargs)
-        elif kwargs:
-            query = query.format(**kwargs)
+        body = self._run_query(query, query_maker, prefix, **kwargs)
+        if isinstance(body, dict):
+            body = benedict(body)
 
-        LOGGER.debug(query)
+        return body
 
-        response = self._post_query(query)
+    def _iter_responses(
+        self,
+        query,
+        prefix,
+        collection_name,
+        query_maker=None,
+        response=None,
+        end_cursor='',
+        **kwargs,
+    ):
+        """Yield the body of every page of a collection, querying each one when needed."""
+        if response is None:
+            response = self._run_query(query, query_maker, prefix, end_cursor=end_cursor, **kwargs)
 
-        if 'errors' in response:
-            first_error = response['errors'][0]
-            if first_error.get('type') == 'RATE_LIMITED':
-                LOGGER.warning('Rate Limit Hit!')
-                rate_limit = self._post_query(RATE_LIMIT_QUERY)
-                LOGGER.warning(rate_limit.to_json(indent=4))
+        while True:
+            yield response
 
-                reset_at = datetime.strptime(rate_limit['data.rateLimit.resetAt'], ISO_DATETIME)
-                sleep = int((reset_at - datetime.utcnow()).total_seconds()) + 10
+            page_info = _get_collection(response, collection_name)['pageInfo']
+            if not page_info['hasNextPage']:
+                return
 
-                LOGGER.warning('Sleeping for %s seconds', sleep)
-                time.sleep(sleep)
-                response = self._post_query(query)
+            end_cursor = _make_end_cursor(page_info)
+            response = self._run_query(query, query_maker, prefix, end_cursor=end_cursor, **kwargs)
 
-        if 'errors' in response:
-            LOGGER.error(response.to_json(indent=4))
-            raise ValueError(response['errors'][0]['message'])
+    def iter_pages(
+        self,
+        query,
+        prefix,
+        fields,
+        query_maker=None,
+        collection_name=None,
+        columns=None,
+        datetime_columns=None,
+        response=None,
+        chunk_size=DEFAULT_CHUNK_SIZE,
+        **kwargs,
+    ):
+        """Run the given query and yield the collection contents in chunks as pages arrive.
 
-        LOGGER.debug(response.to_json(indent=4))
+        The iterator stops querying pages as soon as the caller stops consuming
+        it, which lets the incremental collections stop at the first page that
+        holds elements that were already known.
 
-        if prefix:
-            return response[prefix]
+        Args:
+            query (str):
+                Query to execute.
+            prefix (str):
+                Key where the response body is found.
+            fields (dict[str, str]):
+                Output columns and the keypath where their value is found within
+                each element of the collection. Elements where any of the keys is
+                missing are skipped.
+            query_maker (function):
+                Function to use to build the query. Optional.
+            collection_name (str):
+                If given, pull the collection contents from the body using the
+                indicated key.
+            columns (list):
+                Columns to include in the output DataFrames.
+            datetime_columns (list):
+                Columns to convert to UTC datetimes in each chunk.
+            response (dict):
+                Body of the first page of the collection, if it has already been
+                fetched. If not given, the first page is queried.
+            chunk_size (int):
+                Number of rows of each chunk. The last one may be smaller.
+                Defaults to 100, the size of a page.
+            **kwargs:
+                Any additional keyword arguments are passed to the query_maker.
 
-        return response
+        Yields:
+            pandas.DataFrame:
+                Chunk of the collection contents.
+        """
+        columns = columns or list(fields)
+        paths = [keypath.split('.') for keypath in fields.values()]
+        data = {column: [] for column in fields}
+        responses = self._iter_responses(
+            query, prefix, collection_name, query_maker, response, **kwargs
+        )
+        for response in responses:
+            edges = _get_collection(response, collection_name)['edges']
+            self._parse_edges(edges, paths, list(data.values()))
+
+            rows = len(next(iter(data.values()), []))
+            while rows >= chunk_size:
+                chunk = {column: values[:chunk_size] for column, values in data.items()}
+                data = {column: values[chunk_size:] for column, values in data.items()}
+                rows -= chunk_size
+                yield _make_frame(chunk, columns, datetime_columns)
+
+        if any(data.values()):
+            yield _make_frame(data, columns, datetime_columns)
 
     def paginate_collection(
         self,
         query,
         prefix,
         total,
-        item_parser,
+        item_parser=None,
         query_maker=None,
         collection_name=None,
         pbar=None,
         columns=None,
+        response=None,
+        fields=None,
+        datetime_columns=None,
+        checkpoint=None,
         **kwargs,
     ):
         """Run the given query and paginate the corresponding collection.
@@ -130,7 +323,8 @@ class GQLClient:
                 corresponding value can be found inside the response.
             item_parser (function):
                 Apply this function to each element in the collection
-                to parse it and build the output.
+                to parse it and build the output. Ignored if ``fields``
+                is given.
             query_maker (function):
                 Function to use to build the query. Optional.
             collection_name (str):
@@ -140,6 +334,19 @@ class GQLClient:
                 tqdm progress bar to update. If not given, one is initialized.
             columns (list):
                 Columns to include in the output DataFrame.
+            response (dict):
+                Body of the first page of the collection, if it has already been
+                fetched. If not given, the first page is queried.
+            fields (dict[str, str]):
+                Output columns and the keypath where their value is found within
+                each element of the collection. If given, the elements are parsed
+                directly from the JSON response into one list per column, and
+                elements where any of the keys is missing are skipped.
+            datetime_columns (list):
+                Columns to convert to UTC datetimes once the DataFrame is built.
+            checkpoint (str):
+                Name under which the progress of the pagination is checkpointed,
+                if checkpoints are enabled. Only used together with ``fields``.
             **kwargs:
                 Any additional keyword arguments are passed to the query_maker.
 
@@ -147,15 +354,40 @@ class GQLClient:
             pandas.DataFrame:
                 Table with the collection contents.
         """
-        response = self.run_query(query, query_maker, prefix, end_cursor='', **kwargs)
+        checkpoints = get_checkpoints() if fields and checkpoint else None
+        state = None
+        if checkpoints is not None:
+            first_query = self._format_query(query, query_maker, end_cursor='', **kwargs)
+            signature = checkpoints.get_signature(first_query)
+            state = checkpoints.load(checkpoint, signature)
+
+        pages = 0
+        end_cursor = ''
+        if state is not None:
+            pages = state['pages']
+            end_cursor = state['end_cursor']
+            response = None
+
+        responses = self._iter_responses(
+            query, prefix, collection_name, query_maker, response, end_cursor, **kwargs
+        )
+        response = next(responses)
         if isinstance(total, str):
-            total = response[total]
+            total = get_keypath(response, total)
 
         message = f'Collecting {total} {collection_name}'
         if self.quiet and pbar is None:
             LOGGER.info(message)
 
-        data = []
+        if fields:
+            columns = columns or list(fields)
+            paths = [keypath.split('.') for keypath in fields.values()]
+            data = {column: [] for column in fields}
+            if state is not None:
+                data = {column: state['data'][column] for column in fields}
+        else:
+            data = []
+
         if pbar is None:
             _pbar = tqdm(
                 total=total,
@@ -166,31 +398,54 @@ class GQLClient:
         else:
             _pbar = pbar
 
-        while True:
-            if collection_name:
-                collection = response[collection_name]
+        if state is not None:
+            _pbar.update(len(next(iter(data.values()))))
+
+        for response in itertools.chain([response], responses):
+            collection = _get_collection(response, collection_name)
+            edges = collection['edges']
+            if fields:
+                self._parse_edges(edges, paths, list(data.values()))
             else:
-                collection = response
+                for item in edges:
+                    try:
+                        data.append(item_parser(benedict(item)))
+                    except (TypeError, KeyError):
+                        # Possibly a bot, like dependabot
+                        pass
+
+            _pbar.update(len(edges))
+            pages += 1
 
             page_info = collection['pageInfo']
-            has_next_page = page_info['hasNextPage']
-            end_cursor = f', after: "{page_info["endCursor"]}"'
+            if (
+                checkpoints is not None
+                and page_info['hasNextPage']
+                and pages % checkpoints.interval == 0
+            ):
+                end_cursor = _make_end_cursor(page_info)
+                checkpoints.save(checkpoint, signature, end_cursor, pages, data)
 
-            for item in collection['edges']:
-                try:
-                    data.append(item_parser(benedict(item)))
-                except (TypeError, KeyError):
-                    # Possibly a bot, like dependabot
-                    pass
+        if pbar is None:
+            _pbar.close()
 
-                _pbar.update(1)
+        if checkpoints is not None:
+            checkpoints.remove(checkpoint)
 
-            if not has_next_page:
-                break
+        if fields and not any(data.values()):
+            # Keep the same dtypes as the tables built from rows when there are none
+            data = []
 
-            response = self.run_query(query, query_maker, prefix, end_cursor=end_cursor, **kwargs)
+        return _make_frame(data, columns, datetime_columns)
 
-        if pbar is None:
-            _pbar.close()
+    @staticmethod
+    def _parse_edges(edges, paths, columns):
+        for edge in edges:
+            try:
+                values = [_get_path(edge, path) for path in paths]
+            except (TypeError, KeyError):
+                # Possibly a bot, like dependabot
+                continue
 
-        return pd.DataFrame(data, columns=columns)
+            for column, value in zip(columns, values):
+                column.append(value)
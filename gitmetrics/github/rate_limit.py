@@ -0,0 +1,248 @@
+"""Rate limit budget tracking for the GitHub API.
+
+Every GraphQL query sent by the clients requests the ``rateLimit`` fields
+inline, and the values returned, or the ``x-ratelimit-*`` headers of the REST
+responses, are fed into a ``RateLimitBudget``. The budget works as a token
+bucket: requests are sent freely while the bucket has points, and once it is
+empty they are paced so that the points remaining are spread over the time
+left until the limit is reset, instead of hitting the limit and sleeping.
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+
+from gitmetrics.utils import ISO_DATETIME
+
+LOGGER = logging.getLogger(__name__)
+
+RATE_LIMIT_FIELDS = """
+    rateLimit {
+        cost
+        remaining
+        resetAt
+    }
+"""
+DEFAULT_LIMIT = 5000
+DEFAULT_RESERVE = 100
+DEFAULT_BURST = 0.2
+DEFAULT_PARK_SECONDS = 60
+
+
+def add_rate_limit(query):
+    """Add the ``rateLimit`` fields to the top level selection of the given query."""
+    if 'rateLimit' in query:
+        return query
+
+    end = query.rstrip().rfind('}')
+    return query[:end] + RATE_LIMIT_FIELDS.strip('\n') + '\n' + query[end:]
+
+
+def _parse_datetime(value):
+    return datetime.strptime(value, ISO_DATETIME).replace(tzinfo=timezone.utc).timestamp()
+
+
+class RateLimitBudget:
+    """Thread-safe token bucket that paces the requests sent with one token.
+
+    Args:
+        limit (int):
+            Maximum number of points per reset window. Defaults to 5000.
+        reserve (int):
+            Number of points that are never spent, to leave room for other
+            consumers of the same token. Defaults to 100.
+        burst (float):
+            Fraction of the limit that can be spent at full speed before the
+            requests start being paced. Defaults to 0.2.
+        share (float):
+            Fraction of the budget available to this process, for when the
+            same token is used by several processes at once. Defaults to 1.
+    """
+
+    def __init__(
+        self, limit=DEFAULT_LIMIT, reserve=DEFAULT_RESERVE, burst=DEFAULT_BURST, share=1.0
+    ):
+        self.limit = limit
+        self.reserve = reserve
+        self.share = share
+        self.capacity = limit * burst * share
+        self.remaining = None
+        self.reset_at = None
+        self.cost = 1
+        self.requests = 0
+        self.spent = 0
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0
+        self._lock = threading.Lock()
+
+    def _refill_rate(self, now):
+        seconds_left = max(self.reset_at - now, 1)
+        return max(self.remaining - self.reserve, 0) * self.share / seconds_left
+
+    def _get_delay(self):
+        """Take the points of the next request from the bucket and return how long to wait."""
+        now = time.time()
+        if self._paused_until > now:
+            return self._paused_until - now
+
+        if self.remaining is None or self.reset_at is None or self.reset_at <= now:
+            self._tokens = self.capacity
+            return 0
+
+        if self.remaining - self.reserve < self.cost:
+            self._paused_until = self.reset_at + 1
+            return self._paused_until - now
+
+        monotonic = time.monotonic()
+        rate = self._refill_rate(now)
+        self._tokens = min(self.capacity, self._tokens + (monotonic - self._updated) * rate)
+        self._updated = monotonic
+        self._tokens -= self.cost
+        if self._tokens >= 0:
+            return 0
+
+        return -self._tokens / rate
+
+    def get_available(self):
+        """Get the number of points that can still be spent before the reset.
+
+        Returns:
+            int or None:
+                Number of points available, or None if the budget is exhausted
+                and must not be used until ``resume_at``.
+        """
+        with self._lock:
+            now = time.time()
+            if self._paused_until > now:
+                return None
+
+            if self.remaining is None or self.reset_at is None or self.reset_at <= now:
+                return self.limit - self.reserve
+
+            if self.remaining - self.reserve < self.cost:
+                return None
+
+            return self.remaining - self.reserve
+
+    def get_resume_at(self):
+        """Get the timestamp at which an exhausted budget can be used again."""
+        with self._lock:
+            return max(self._paused_until, (self.reset_at or 0) + 1)
+
+    def acquire(self):
+        """Wait until the next request can be sent without exceeding the budget."""
+        with self._lock:
+            delay = self._get_delay()
+            self.requests += 1
+            if self.remaining is not None:
+                self.remaining -= self.cost
+
+        if delay > 0:
+            level = logging.WARNING if delay > 60 else logging.DEBUG
+            LOGGER.log(level, 'Rate limit budget exhausted. Sleeping for %.1f seconds', delay)
+            time.sleep(delay)
+
+    def update(self, remaining, reset_at, cost=None):
+        """Update the budget with the values reported by the API.
+
+        Args:
+            remaining (int):
+                Number of points remaining in the current window.
+            reset_at (float):
+                Timestamp at which the window is reset.
+            cost (int):
+                Cost of the last request, if known.
+        """
+        with self._lock:
+            if cost is not None:
+                self.cost = max(cost, 1)
+                self.spent += cost
+
+            self.remaining = remaining
+            self.reset_at = reset_at
+
+    def update_from_rate_limit(self, rate_limit):
+        """Update the budget with the ``rateLimit`` object of a GraphQL response."""
+        reset_at = _parse_datetime(rate_limit['resetAt'])
+        self.update(rate_limit['remaining'], reset_at, rate_limit.get('cost') or 0)
+
+    def update_from_headers(self, headers):
+        """Update the budget with the ``x-ratelimit-*`` headers of an HTTP response."""
+        remaining = headers.get('x-ratelimit-remaining')
+        reset_at = headers.get('x-ratelimit-reset')
+        if remaining is not None and reset_at is not None:
+            self.update(int(remaining), float(reset_at))
+
+    def exhaust(self):
+        """Mark the budget as exhausted after the API reported a rate limit error."""
+        with self._lock:
+            self.remaining = 0
+            if self.reset_at is None or self.reset_at <= time.time():
+                self._paused_until = time.time() + DEFAULT_PARK_SECONDS
+
+    def snapshot(self):
+        """Get the current state of the budget.
+
+        Returns:
+            dict:
+                ``remaining`` points, ``reset_at`` datetime, ``rate`` in points
+                per second at which the requests are currently being paced and
+                the number of ``requests`` sent and points ``spent`` so far.
+        """
+        with self._lock:
+            now = time.time()
+            known = self.remaining is not None and self.reset_at > now
+            return {
+                'remaining': self.remaining,
+                'reset_at': datetime.fromtimestamp(self.reset_at, tz=timezone.utc)
+                if self.reset_at
+                else None,
+                'rate': self._refill_rate(now) if known else None,
+                'requests': self.requests,
+                'spent': self.spent,
+            }
+
+
+_BUDGETS = {}
+_BUDGETS_LOCK = threading.Lock()
+
+
+def get_budget(token, resource='graphql'):
+    """Get the budget shared by all the clients that use the given token.
+
+    Args:
+        token (str):
+            GitHub token.
+        resource (str):
+            GitHub API resource that the budget tracks, ``graphql`` or
+            ``core`` for the REST API. Defaults to ``graphql``.
+
+    Returns:
+        RateLimitBudget
+    """
+    with _BUDGETS_LOCK:
+        key = (token, resource)
+        if key not in _BUDGETS:
+            _BUDGETS[key] = RateLimitBudget()
+
+        return _BUDGETS[key]
+
+
+def log_budgets():
+    """Log the state of the budget of every token and resource used so far."""
+    with _BUDGETS_LOCK:
+        budgets = [(resource, budget) for (_, resource), budget in _BUDGETS.items()]
+
+    for index, (resource, budget) in enumerate(budgets):
+        snapshot = budget.snapshot()
+        LOGGER.info(
+            'Rate limit budget %s (%s): %s requests, %s points spent, %s remaining until %s',
+            index,
+            resource,
+            snapshot['requests'],
+            snapshot['spent'],
+            snapshot['remaining'],
+            snapshot['reset_at'],
+        )
@@ -1,9 +1,16 @@
 """GraphQLClient subclass specialized in queries related to a specific repository."""
 
+import logging
+import math
+
 import pandas as pd
+from tqdm.auto import tqdm
+
+from gitmetrics.github.client import DEFAULT_CHUNK_SIZE, GQLClient, get_keypath
+from gitmetrics.github.sharding import SEARCH_LIMIT, get_shard_count, split_window
+from gitmetrics.utils import ISO_DATETIME, to_utc
 
-from gitmetrics.github.client import GQLClient
-from gitmetrics.utils import to_utc
+LOGGER = logging.getLogger(__name__)
 
 REPO_ENVELOPE = """
 {{
@@ -12,9 +19,21 @@ REPO_ENVELOPE = """
     }}
 }}
 """
+SEARCH_ENVELOPE = """
+{{
+    {query_body}
+}}
+"""
+FIRST_CREATED = """
+{collection}(first: 1, orderBy: {{field: CREATED_AT, direction: ASC}}) {{
+    nodes {{
+        createdAt
+    }}
+}}
+"""
 STARGAZERS_COUNT = 'stargazerCount'
 STARGAZERS = """
-stargazers(first: 100{end_cursor}{filter_by}) {{
+stargazers(first: 100{end_cursor}{filter_by}{order_by}) {{
     pageInfo {{
         endCursor
         hasNextPage
@@ -39,20 +58,58 @@ stargazers(first: 100{end_cursor}{filter_by}) {{
     }}
 }}
 """
-STARGAZERS_COLUMNS = [
-    'user',
+STARGAZERS_FIELDS = {
+    'user': 'node.login',
+    'starred_at': 'starredAt',
+    'name': 'node.name',
+    'email': 'node.email',
+    'blog': 'node.websiteUrl',
+    'company': 'node.company',
+    'location': 'node.location',
+    'twitter': 'node.twitterUsername',
+    'user_created_at': 'node.createdAt',
+    'user_updated_at': 'node.updatedAt',
+    'bio': 'node.bio',
+}
+STARGAZERS_COLUMNS = list(STARGAZERS_FIELDS)
+STARGAZERS_DATETIME_COLUMNS = [
     'starred_at',
-    'name',
-    'email',
-    'blog',
-    'company',
-    'location',
-    'twitter',
     'user_created_at',
     'user_updated_at',
-    'bio',
 ]
 
+PROBE = """
+updatedAt
+pushedAt
+stargazerCount
+issues {{
+    totalCount
+}}
+lastIssue: issues(first: 1, orderBy: {{field: UPDATED_AT, direction: DESC}}) {{
+    nodes {{
+        updatedAt
+    }}
+}}
+pullRequests {{
+    totalCount
+}}
+lastPullRequest: pullRequests(first: 1, orderBy: {{field: UPDATED_AT, direction: DESC}}) {{
+    nodes {{
+        updatedAt
+    }}
+}}
+"""
+PROBE_FIELDS = {
+    'updated_at': 'updatedAt',
+    'pushed_at': 'pushedAt',
+    'stargazers': 'stargazerCount',
+    'issues': 'issues.totalCount',
+    'issues_updated_at': 'lastIssue.nodes.0.updatedAt',
+    'pull_requests': 'pullRequests.totalCount',
+    'pull_requests_updated_at': 'lastPullRequest.nodes.0.updatedAt',
+}
+PROBE_COLUMNS = list(PROBE_FIELDS)
+
 ISSUES_COUNT = """
 issues {{
     totalCount
@@ -85,15 +142,21 @@ issues(first: 100{end_cursor}{filter_by}) {{
     }}
 }}
 """
-ISSUES_COLUMNS = [
-    'user',
-    'number',
-    'comments',
+ISSUES_FIELDS = {
+    'user': 'node.author.login',
+    'number': 'node.number',
+    'comments': 'node.comments.totalCount',
+    'created_at': 'node.createdAt',
+    'closed_at': 'node.closedAt',
+    'updated_at': 'node.updatedAt',
+    'state': 'node.state',
+    'title': 'node.title',
+}
+ISSUES_COLUMNS = list(ISSUES_FIELDS)
+ISSUES_DATETIME_COLUMNS = [
     'created_at',
     'closed_at',
     'updated_at',
-    'state',
-    'title',
 ]
 
 PULL_REQUESTS_COUNT = """
@@ -102,7 +165,7 @@ pullRequests {{
 }}
 """
 PULL_REQUESTS = """
-pullRequests(first: 100{end_cursor}{filter_by}) {{
+pullRequests(first: 100{end_cursor}{filter_by}{order_by}) {{
     pageInfo {{
         endCursor
         hasNextPage
@@ -128,18 +191,101 @@ pullRequests(first: 100{end_cursor}{filter_by}) {{
     }}
 }}
 """
-PULL_REQUESTS_COLUMNS = [
-    'user',
-    'number',
-    'comments',
+PULL_REQUESTS_FIELDS = {
+    'user': 'node.author.login',
+    'number': 'node.number',
+    'comments': 'node.comments.totalCount',
+    'created_at': 'node.createdAt',
+    'closed_at': 'node.closedAt',
+    'updated_at': 'node.updatedAt',
+    'state': 'node.state',
+    'title': 'node.title',
+}
+PULL_REQUESTS_COLUMNS = list(PULL_REQUESTS_FIELDS)
+PULL_REQUESTS_DATETIME_COLUMNS = [
     'created_at',
     'closed_at',
     'updated_at',
-    'state',
-    'title',
 ]
 
+SEARCH = """
+search(query: "{search_query}", type: ISSUE, first: 100{end_cursor}) {{
+    pageInfo {{
+        endCursor
+        hasNextPage
+        hasPreviousPage
+        startCursor
+    }}
+    issueCount
+    edges {{
+        node {{
+            ... on {node_type} {{
+                id
+                author {{
+                    login
+                }}
+                number
+                createdAt
+                updatedAt
+                closedAt
+                state
+                title
+                comments {{
+                    totalCount
+                }}
+            }}
+        }}
+    }}
+}}
+"""
+SEARCH_FIELDS = dict(ISSUES_FIELDS, id='node.id')
+SEARCH_QUALIFIERS = {
+    'issues': ('is:issue', 'Issue'),
+    'pullRequests': ('is:pr', 'PullRequest'),
+}
+
 SINCE = ', filterBy: {{since: "{since}"}}'
+ORDER_BY = ', orderBy: {{field: {field}, direction: {direction}}}'
+ORDER_FIELDS = {
+    'stargazers': 'STARRED_AT',
+    'pullRequests': 'UPDATED_AT',
+}
+STARGAZERS_OVERLAP = 100
+COLLECTIONS = {
+    'issues': ISSUES,
+    'pullRequests': PULL_REQUESTS,
+    'stargazers': STARGAZERS,
+}
+
+
+def _concat(frames):
+    # Empty frames have object columns, which would change the dtypes of the others
+    non_empty = [frame for frame in frames if not frame.empty]
+    return pd.concat(non_empty or frames[:1], ignore_index=True)
+
+
+def _take_newer(chunks, column, after, columns):
+    """Take the rows of the chunks, newest first, until one is older than ``after``.
+
+    Rows whose date is equal to ``after`` are also taken, since others may share
+    the date of the newest row already known. Callers must upsert them on their
+    key to drop the ones that were already known.
+
+    Returns:
+        pandas.DataFrame:
+            The rows not older than ``after``, ordered from oldest to newest.
+    """
+    frames = []
+    for chunk in chunks:
+        newer = chunk[chunk[column] >= after]
+        frames.append(newer)
+        if len(newer) < len(chunk):
+            break
+
+    if not frames:
+        return pd.DataFrame(columns=columns)
+
+    return _concat(frames).iloc[::-1].reset_index(drop=True)
 
 
 class RepositoryClient(GQLClient):
@@ -161,83 +307,339 @@ class RepositoryClient(GQLClient):
 
         return query_body.format(**kwargs)
 
-    def _make_query(self, query_body, since=None, **kwargs):
+    @classmethod
+    def _make_query_body(cls, query_body, since=None, **kwargs):
         if pd.notna(since):
             kwargs['filter_by'] = SINCE.format(since=since.isoformat())
         else:
             kwargs.setdefault('filter_by', '')
 
-        query_body = self._indent_query(query_body, **kwargs)
+        kwargs.setdefault('order_by', '')
+        return cls._indent_query(query_body, **kwargs)
+
+    @staticmethod
+    def _make_order_by(collection, direction=None):
+        if not direction:
+            return ''
+
+        return ORDER_BY.format(field=ORDER_FIELDS[collection], direction=direction)
+
+    def _make_query(self, query_body, since=None, **kwargs):
+        query_body = self._make_query_body(query_body, since, **kwargs)
         return REPO_ENVELOPE.format(owner=self.owner, name=self.name, query_body=query_body)[1:-1]
 
+    def _make_search_query(self, query_body, **kwargs):
+        query_body = self._indent_query(query_body, **kwargs)
+        return SEARCH_ENVELOPE.format(query_body=query_body)[1:-1]
+
+    def _get_first_page(self, query_body, since=None):
+        query = self._make_query(query_body, since, end_cursor='')
+        return self._run_query(query, prefix='data.repository')
+
+    def _get_search_windows(self, collection, shards):
+        """Split the time since the first element of the collection was created in windows."""
+        query = self._make_query(FIRST_CREATED, collection=collection)
+        response = self._run_query(query, prefix='data.repository')
+        created_at = to_utc(response[collection]['nodes'][0]['createdAt'])
+        now = pd.Timestamp.now(tz='UTC').tz_localize(None)
+        return split_window(created_at, now, shards)
+
+    def _search_window(self, collection, start, end, since, pbar=None):
+        """Search the elements of the collection created within the given window.
+
+        Searches return at most 1000 results, so windows that contain more
+        elements are split in halves until they fit.
+        """
+        qualifier, node_type = SEARCH_QUALIFIERS[collection]
+        window = f'{start.strftime(ISO_DATETIME)}..{end.strftime(ISO_DATETIME)}'
+        search_query = f'repo:{self.repo} {qualifier} created:{window}'
+        if pd.notna(since):
+            search_query += f' updated:>={since.strftime(ISO_DATETIME)}'
+
+        kwargs = {'search_query': search_query, 'node_type': node_type}
+        response = self._run_query(SEARCH, self._make_search_query, 'data', end_cursor='', **kwargs)
+        total = response['search']['issueCount']
+        halves = split_window(start, end, 2)
+        if total > SEARCH_LIMIT and len(halves) > 1:
+            return _concat([self._search_window(collection, *half, since, pbar) for half in halves])
+
+        _pbar = pbar or tqdm(
+            total=total,
+            disable=self.quiet,
+            desc=f'Collecting {total} {collection} created {window}',
+            unit=' ' + collection,
+        )
+        data = self.paginate_collection(
+            query=SEARCH,
+            prefix='data',
+            total=total,
+            collection_name='search',
+            query_maker=self._make_search_query,
+            pbar=_pbar,
+            columns=list(SEARCH_FIELDS),
+            response=response,
+            fields=SEARCH_FIELDS,
+            datetime_columns=ISSUES_DATETIME_COLUMNS,
+            **kwargs,
+        )
+        if pbar is None:
+            _pbar.close()
+
+        return data
+
+    def _get_stargazers_head(self, direction, limit, since=None, first_page=None):
+        """Get the first ``limit`` stargazers, ordered by their starring date."""
+        if first_page is not None:
+            # The first page was fetched with the default order, which is ascending
+            direction = None
+
+        frames = []
+        rows = 0
+        for chunk in self.iter_stargazers(since, first_page, direction=direction):
+            frames.append(chunk)
+            rows += len(chunk)
+            if rows >= limit:
+                break
+
+        if not frames:
+            return pd.DataFrame(columns=STARGAZERS_COLUMNS)
+
+        return pd.concat(frames, ignore_index=True).head(limit)
+
+    def get_shards(self, collection, since=None, first_page=None):
+        """Get the shards in which a collection of this repository is split.
+
+        The issues and pull requests are split in windows of their creation
+        date, which are fetched through search queries. Stargazers can only be
+        ordered by their starring date, so they are split in at most two
+        shards that are fetched from both ends of the list. The two ends
+        overlap by one page, so that stars added while fetching them do not
+        leave a gap.
+
+        The ``get_*`` methods of this client fetch the shards one after another,
+        while the ``AsyncRepositoryClient`` fetches them concurrently within
+        the limit of its semaphore.
+
+        Args:
+            collection (str):
+                Name of the collection, ``issues``, ``pullRequests`` or
+                ``stargazers``.
+            since (datetime):
+                If given, only get the elements updated after this date.
+            first_page (dict):
+                Repository body with the first page of the collection, if it
+                has already been fetched by a ``BatchRepositoryClient``.
+
+        Returns:
+            tuple[dict, list]:
+                The first page of the collection and the shards to fetch with
+                ``get_shard``. If the collection is small enough to be fetched
+                with a single cursor, the list of shards is empty.
+        """
+        if first_page is None:
+            first_page = self._get_first_page(COLLECTIONS[collection], since)
+
+        total = get_keypath(first_page, f'{collection}.totalCount') or 0
+        shards = get_shard_count(total)
+        if shards == 1:
+            return first_page, []
+
+        if collection == 'stargazers':
+            half = math.ceil(total / 2)
+            shards = [('ASC', half), ('DESC', total - half + STARGAZERS_OVERLAP)]
+        else:
+            shards = self._get_search_windows(collection, shards)
+
+        if self.quiet:
+            LOGGER.info(f'Collecting {total} {collection} in {len(shards)} shards')
+
+        return first_page, shards
+
+    def get_shard(self, collection, shard, since=None, first_page=None):
+        """Get the elements of a collection that belong to the given shard.
+
+        Args:
+            collection (str):
+                Name of the collection.
+            shard (tuple):
+                Shard to fetch, as returned by ``get_shards``.
+            since (datetime):
+                If given, only get the elements updated after this date.
+            first_page (dict):
+                First page of the collection, as returned by ``get_shards``.
+
+        Returns:
+            pandas.DataFrame
+        """
+        if collection == 'stargazers':
+            direction, limit = shard
+            first_page = first_page if direction == 'ASC' else None
+            return self._get_stargazers_head(direction, limit, since, first_page)
+
+        return self._search_window(collection, *shard, since)
+
+    @staticmethod
+    def merge_shards(collection, frames):
+        """Merge the shards of a collection, in the order returned by ``get_shards``.
+
+        Shards are fetched at different times, so the elements created or
+        updated meanwhile may appear in more than one of them. Issues and pull
+        requests are deduplicated on their node id and sorted by their number,
+        and stargazers are deduplicated on the ``user`` and sorted by their
+        starring date.
+
+        Args:
+            collection (str):
+                Name of the collection.
+            frames (list[pandas.DataFrame]):
+                Elements of each shard.
+
+        Returns:
+            pandas.DataFrame
+        """
+        if collection == 'stargazers':
+            head, tail = frames
+            data = _concat([head, tail.iloc[::-1]]).drop_duplicates('user')
+            return data.reset_index(drop=True)
+
+        data = _concat(frames).drop_duplicates('id').sort_values('number', kind='stable')
+        return data.drop(columns='id').reset_index(drop=True)
+
+    def _get_sharded(self, collection, shards, since=None, first_page=None):
+        frames = [self.get_shard(collection, shard, since, first_page) for shard in shards]
+        return self.merge_shards(collection, frames)
+
     def get_stargazer_count(self):
         """Get the number of stargazers of this repository."""
         query = self._make_query(STARGAZERS_COUNT)
         response = self.run_query(query, prefix='data.repository')
         return response[STARGAZERS_COUNT]
 
-    @staticmethod
-    def _stargazer_parser(stargazer):
-        node = stargazer['node']
-        return {
-            'user': node['login'],
-            'starred_at': to_utc(stargazer['starredAt']),
-            'name': node['name'],
-            'email': node['email'],
-            'blog': node['websiteUrl'],
-            'company': node['company'],
-            'location': node['location'],
-            'twitter': node['twitterUsername'],
-            'user_created_at': to_utc(node['createdAt']),
-            'user_updated_at': to_utc(node['updatedAt']),
-            'bio': node['bio'],
-        }
-
-    def get_stargazers(self, since=None):
-        """Get the stargazers of this repository."""
+    def get_stargazers(self, since=None, first_page=None):
+        """Get the stargazers of this repository.
+
+        Args:
+            since (datetime):
+                If given, passed to the query as the ``since`` filter.
+            first_page (dict):
+                Repository body with the first page of the stargazers, if it has
+                already been fetched by a ``BatchRepositoryClient``.
+
+        Returns:
+            pandas.DataFrame
+        """
+        first_page, shards = self.get_shards('stargazers', since, first_page)
+        if shards:
+            return self._get_sharded('stargazers', shards, since, first_page)
+
         return self.paginate_collection(
             query=STARGAZERS,
             prefix='data.repository',
             total='stargazers.totalCount',
             collection_name='stargazers',
-            item_parser=self._stargazer_parser,
             query_maker=self._make_query,
             since=since,
             columns=STARGAZERS_COLUMNS,
+            response=first_page,
+            fields=STARGAZERS_FIELDS,
+            datetime_columns=STARGAZERS_DATETIME_COLUMNS,
+            checkpoint=f'{self.repo}/stargazers',
         )
 
+    def iter_stargazers(
+        self, since=None, first_page=None, chunk_size=DEFAULT_CHUNK_SIZE, direction=None
+    ):
+        """Iterate over the stargazers of this repository in chunks, as pages arrive.
+
+        Args:
+            since (datetime):
+                If given, passed to the query as the ``since`` filter.
+            first_page (dict):
+                Repository body with the first page of the stargazers, if it has
+                already been fetched by a ``BatchRepositoryClient``.
+            chunk_size (int):
+                Number of rows of each chunk. Defaults to 100.
+            direction (str):
+                If given, order the stargazers by their starring date in this
+                direction, ``ASC`` or ``DESC``. Otherwise the default order of
+                the API is used.
+
+        Yields:
+            pandas.DataFrame
+        """
+        return self.iter_pages(
+            query=STARGAZERS,
+            prefix='data.repository',
+            fields=STARGAZERS_FIELDS,
+            query_maker=self._make_query,
+            collection_name='stargazers',
+            columns=STARGAZERS_COLUMNS,
+            datetime_columns=STARGAZERS_DATETIME_COLUMNS,
+            response=first_page,
+            chunk_size=chunk_size,
+            since=since,
+            order_by=self._make_order_by('stargazers', direction),
+        )
+
+    def get_new_stargazers(self, starred_after, first_page=None):
+        """Get the stargazers that starred this repository since the given date.
+
+        Stargazers are fetched newest first and the pagination stops at the first
+        page that goes past the given date, so only the pages that contain new
+        stargazers are queried. The stargazers that starred it at the given date
+        are included, so the ones already known must be deduplicated on the
+        ``user``.
+
+        Args:
+            starred_after (datetime):
+                Starring date of the newest stargazer already known.
+            first_page (dict):
+                Repository body with the first page of the stargazers ordered by
+                descending starring date, if it has already been fetched by a
+                ``BatchRepositoryClient``.
+
+        Returns:
+            pandas.DataFrame:
+                The new stargazers, ordered by ascending starring date.
+        """
+        chunks = self.iter_stargazers(first_page=first_page, direction='DESC')
+        return _take_newer(chunks, 'starred_at', starred_after, STARGAZERS_COLUMNS)
+
     def get_issue_count(self):
         """Get the number of issues of this repository."""
         query = self._make_query(ISSUES_COUNT)
         response = self.run_query(query, prefix='data.repository')
         return response['issues.totalCount']
 
-    @staticmethod
-    def _issue_parser(issue):
-        node = issue['node']
-        author = node['author'] or {}
-        return {
-            'user': author.get('login'),
-            'number': node['number'],
-            'comments': node['comments.totalCount'],
-            'created_at': to_utc(node['createdAt']),
-            'closed_at': to_utc(node['closedAt']),
-            'updated_at': to_utc(node['updatedAt']),
-            'state': node['state'],
-            'title': node['title'],
-        }
-
-    def get_issues(self, since=None):
-        """Get the issues of this repository."""
+    def get_issues(self, since=None, first_page=None):
+        """Get the issues of this repository.
+
+        Args:
+            since (datetime):
+                If given, only get the issues updated after this date.
+            first_page (dict):
+                Repository body with the first page of the issues, if it has
+                already been fetched by a ``BatchRepositoryClient``.
+
+        Returns:
+            pandas.DataFrame
+        """
+        first_page, shards = self.get_shards('issues', since, first_page)
+        if shards:
+            return self._get_sharded('issues', shards, since, first_page)
+
         return self.paginate_collection(
             query=ISSUES,
             prefix='data.repository',
             total='issues.totalCount',
             collection_name='issues',
-            item_parser=self._issue_parser,
             query_maker=self._make_query,
             since=since,
             columns=ISSUES_COLUMNS,
+            response=first_page,
+            fields=ISSUES_FIELDS,
+            datetime_columns=ISSUES_DATETIME_COLUMNS,
+            checkpoint=f'{self.repo}/issues',
         )
 
     def get_pull_requests_count(self):
@@ -246,30 +648,92 @@ class RepositoryClient(GQLClient):
         response = self.run_query(query, prefix='data.repository')
         return response['pullRequests.totalCount']
 
-    @staticmethod
-    def _pull_request_parser(pull_request):
-        node = pull_request['node']
-        author = node['author'] or {}
-        return {
-            'user': author.get('login'),
-            'number': node['number'],
-            'comments': node['comments.totalCount'],
-            'created_at': to_utc(node['createdAt']),
-            'closed_at': to_utc(node['closedAt']),
-            'updated_at': to_utc(node['updatedAt']),
-            'state': node['state'],
-            'title': node['title'],
-        }
-
-    def get_pull_requests(self, since=None):
-        """Get the pull requests of this repository."""
+    def get_pull_requests(self, since=None, first_page=None):
+        """Get the pull requests of this repository.
+
+        Args:
+            since (datetime):
+                If given, only get the pull requests updated after this date.
+            first_page (dict):
+                Repository body with the first page of the pull requests, if it has
+                already been fetched by a ``BatchRepositoryClient``.
+
+        Returns:
+            pandas.DataFrame
+        """
+        first_page, shards = self.get_shards('pullRequests', since, first_page)
+        if shards:
+            return self._get_sharded('pullRequests', shards, since, first_page)
+
         return self.paginate_collection(
             query=PULL_REQUESTS,
             prefix='data.repository',
             total='pullRequests.totalCount',
             collection_name='pullRequests',
-            item_parser=self._pull_request_parser,
             query_maker=self._make_query,
             since=since,
             columns=PULL_REQUESTS_COLUMNS,
+            response=first_page,
+            fields=PULL_REQUESTS_FIELDS,
+            datetime_columns=PULL_REQUESTS_DATETIME_COLUMNS,
+            checkpoint=f'{self.repo}/pullRequests',
         )
+
+    def iter_pull_requests(
+        self, since=None, first_page=None, chunk_size=DEFAULT_CHUNK_SIZE, direction=None
+    ):
+        """Iterate over the pull requests of this repository in chunks, as pages arrive.
+
+        Args:
+            since (datetime):
+                If given, only get the pull requests updated after this date.
+            first_page (dict):
+                Repository body with the first page of the pull requests, if it has
+                already been fetched by a ``BatchRepositoryClient``.
+            chunk_size (int):
+                Number of rows of each chunk. Defaults to 100.
+            direction (str):
+                If given, order the pull requests by their last update date in
+                this direction, ``ASC`` or ``DESC``. Otherwise the default order
+                of the API is used.
+
+        Yields:
+            pandas.DataFrame
+        """
+        return self.iter_pages(
+            query=PULL_REQUESTS,
+            prefix='data.repository',
+            fields=PULL_REQUESTS_FIELDS,
+            query_maker=self._make_query,
+            collection_name='pullRequests',
+            columns=PULL_REQUESTS_COLUMNS,
+            datetime_columns=PULL_REQUESTS_DATETIME_COLUMNS,
+            response=first_page,
+            chunk_size=chunk_size,
+            since=since,
+            order_by=self._make_order_by('pullRequests', direction),
+        )
+
+    def get_updated_pull_requests(self, updated_after, first_page=None):
+        """Get the pull requests of this repository updated since the given date.
+
+        Pull requests are fetched by descending update date and the pagination
+        stops at the first page that goes past the given date, so only the pages
+        that contain updated pull requests are queried. The pull requests last
+        updated at the given date are included, so the ones already known must
+        be deduplicated on their ``repository`` and ``number``.
+
+        Args:
+            updated_after (datetime):
+                Last update date of the newest pull request already known.
+            first_page (dict):
+                Repository body with the first page of the pull requests ordered
+                by descending update date, if it has already been fetched by a
+                ``BatchRepositoryClient``.
+
+        Returns:
+            pandas.DataFrame:
+                The updated pull requests, ordered by ascending update date.
+        """
+        chunks = self.iter_pull_requests(first_page=first_page, direction='DESC')
+        return _take_newer(chunks, 'updated_at', updated_after, PULL_REQUESTS_COLUMNS)
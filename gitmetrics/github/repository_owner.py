@@ -1,6 +1,9 @@
 """GQLClient subclass specialized in repository_owner-related queries."""
 
+import textwrap
+
 from gitmetrics.github.client import GQLClient
+from gitmetrics.github.repository import PROBE, PROBE_FIELDS
 
 REPOSITORIES = """
 {{
@@ -16,15 +19,18 @@ REPOSITORIES = """
             edges {{
                 node {{
                     name
+{probe}
                 }}
             }}
         }}
     }}
 }}
 """
-REPOSITORY_COLUMNS = [
-    'repository',
-]
+REPOSITORY_FIELDS = {
+    'repository': 'node.name',
+    **{column: f'node.{keypath}' for column, keypath in PROBE_FIELDS.items()},
+}
+REPOSITORY_COLUMNS = list(REPOSITORY_FIELDS)
 
 
 class RepositoryOwnerClient(GQLClient):
@@ -34,21 +40,19 @@ class RepositoryOwnerClient(GQLClient):
         self._repository_owner = repository_owner
         super().__init__(token, quiet)
 
-    @staticmethod
-    def _repository_parser(user):
-        node = user['node']
-        return {
-            'repository': node['name'],
-        }
-
     def get_repositories(self):
-        """Get the repositories of this repository owner."""
+        """Get the repositories of this repository owner.
+
+        Along with the name of each repository, the values of its probe are
+        returned, so that the listing also tells which repositories changed.
+        """
         return self.paginate_collection(
             query=REPOSITORIES,
             prefix='data.repositoryOwner',
             total='repositories.totalCount',
             collection_name='repositories',
-            item_parser=self._repository_parser,
             columns=REPOSITORY_COLUMNS,
+            fields=REPOSITORY_FIELDS,
             repository_owner=self._repository_owner,
+            probe=textwrap.indent(PROBE.format().strip(), ' ' * 20),
         )
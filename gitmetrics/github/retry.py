@@ -0,0 +1,219 @@
+"""Retry policy for the transient failures of the GitHub API.
+
+GitHub regularly answers heavy GraphQL queries with 502 or 503 errors, and
+throttles bursts of requests with secondary rate limits, returned as 403 or 429
+errors that usually carry a ``Retry-After`` header. These requests are retried
+after a delay, which is either the one requested by GitHub or an exponential
+backoff with jitter.
+
+The retries, and the repositories that could not be collected even after
+retrying, are accounted for so they can be reported at the end of the run.
+"""
+
+import collections
+import logging
+import random
+import threading
+import time
+
+import requests
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_BASE_DELAY = 1
+DEFAULT_MAX_DELAY = 60
+SECONDARY_RATE_LIMIT_DELAY = 60
+RETRY_STATUS_CODES = (500, 502, 503, 504)
+RATE_LIMIT_STATUS_CODES = (403, 429)
+
+
+class RetryPolicy:
+    """Exponential backoff with jitter, honoring the delays requested by GitHub.
+
+    Args:
+        max_attempts (int):
+            Maximum number of times a request is sent. Defaults to 5.
+        base_delay (float):
+            Delay before the first retry, in seconds, which is doubled on
+            every attempt. Defaults to 1.
+        max_delay (float):
+            Maximum backoff delay, in seconds. Delays requested by GitHub
+            through headers are always honored. Defaults to 60.
+    """
+
+    def __init__(
+        self,
+        max_attempts=DEFAULT_MAX_ATTEMPTS,
+        base_delay=DEFAULT_BASE_DELAY,
+        max_delay=DEFAULT_MAX_DELAY,
+    ):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    @staticmethod
+    def _is_rate_limited(response):
+        headers = response.headers
+        return (
+            'retry-after' in headers
+            or headers.get('x-ratelimit-remaining') == '0'
+            or 'secondary rate limit' in response.text.lower()
+        )
+
+    def is_retryable(self, response):
+        """Tell whether the given response is a failure worth retrying."""
+        if response.status_code in RETRY_STATUS_CODES:
+            return True
+
+        return response.status_code in RATE_LIMIT_STATUS_CODES and self._is_rate_limited(response)
+
+    def _get_backoff(self, attempt):
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return random.uniform(0, delay)
+
+    def get_delay(self, attempt, response=None):
+        """Get the number of seconds to wait before sending the request again.
+
+        Args:
+            attempt (int):
+                Number of the attempt that just failed, starting at 1.
+            response (requests.Response):
+                Failed response, if any.
+
+        Returns:
+            float:
+                Delay in seconds.
+        """
+        if response is None or response.status_code not in RATE_LIMIT_STATUS_CODES:
+            return self._get_backoff(attempt)
+
+        headers = response.headers
+        retry_after = headers.get('retry-after', '')
+        if retry_after.isdigit():
+            return float(retry_after)
+
+        reset = headers.get('x-ratelimit-reset', '')
+        if headers.get('x-ratelimit-remaining') == '0' and reset.isdigit():
+            return max(float(reset) - time.time(), 0) + 1
+
+        return SECONDARY_RATE_LIMIT_DELAY + self._get_backoff(attempt)
+
+    def send(self, request):
+        """Send a request, retrying it while it fails with a transient error.
+
+        Args:
+            request (function):
+                Function without arguments that sends the request and returns
+                the ``requests.Response``.
+
+        Returns:
+            requests.Response:
+                The first response that is not retryable, or the last one
+                if all the attempts failed.
+
+        Raises:
+            requests.ConnectionError or requests.Timeout:
+                If the last attempt failed to get a response.
+        """
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                response = request()
+            except (requests.ConnectionError, requests.Timeout) as error:
+                if attempt == self.max_attempts:
+                    raise
+
+                reason = type(error).__name__
+                delay = self.get_delay(attempt)
+            else:
+                if attempt == self.max_attempts or not self.is_retryable(response):
+                    return response
+
+                reason = response.status_code
+                delay = self.get_delay(attempt, response)
+
+            LOGGER.warning(
+                'Request failed (%s), retrying in %.1f seconds (attempt %s of %s)',
+                reason,
+                delay,
+                attempt,
+                self.max_attempts,
+            )
+            _record_retry(reason)
+            time.sleep(delay)
+
+
+_LOCK = threading.Lock()
+_POLICY = RetryPolicy()
+_RETRIES = collections.Counter()
+_FAILURES = {}
+
+
+def configure(
+    max_attempts=DEFAULT_MAX_ATTEMPTS,
+    base_delay=DEFAULT_BASE_DELAY,
+    max_delay=DEFAULT_MAX_DELAY,
+):
+    """Configure the retry policy used by all the clients.
+
+    Args:
+        max_attempts (int):
+            Maximum number of times a request is sent.
+        base_delay (float):
+            Delay before the first retry, in seconds.
+        max_delay (float):
+            Maximum backoff delay, in seconds.
+    """
+    global _POLICY
+
+    _POLICY = RetryPolicy(max_attempts, base_delay, max_delay)
+
+
+def get_policy():
+    """Get the retry policy used by all the clients."""
+    return _POLICY
+
+
+def _record_retry(reason):
+    with _LOCK:
+        _RETRIES[reason] += 1
+
+
+def record_failure(repository, error):
+    """Record that the given repository could not be collected.
+
+    Args:
+        repository (str):
+            Repository, passed as ``{owner}/{name}``.
+        error (Exception):
+            Error that made the collection fail.
+    """
+    with _LOCK:
+        _FAILURES[repository] = f'{type(error).__name__}: {error}'
+
+
+def get_stats():
+    """Get the retries and failures recorded so far.
+
+    Returns:
+        dict:
+            Number of ``retries`` by reason, and ``failures`` as a dict of
+            repositories and the error that made them fail.
+    """
+    with _LOCK:
+        return {
+            'retries': dict(_RETRIES),
+            'failures': dict(_FAILURES),
+        }
+
+
+def log_stats():
+    """Log the retries made and the repositories that failed during the run."""
+    stats = get_stats()
+    if stats['retries']:
+        LOGGER.info('Retried requests: %s', stats['retries'])
+
+    if stats['failures']:
+        LOGGER.warning('Failed to collect %s repositories:', len(stats['failures']))
+        for repository, error in stats['failures'].items():
+            LOGGER.warning('    %s: %s', repository, error)
@@ -0,0 +1,84 @@
+"""Split the collections of very large repositories into shards fetched in parallel.
+
+Cursor pagination forces the pages of a collection to be fetched one after
+another. Collections with more than ``shard_size`` elements are instead split
+into independent shards: time windows of the creation date for the issues and
+pull requests, which are fetched through search queries, and both ends of the
+list for the stargazers, which can only be ordered by their starring date and
+are therefore never split in more than two shards.
+
+Sharding is disabled by default: the search index lags behind the repository,
+so the issues and pull requests created or updated shortly before a sharded
+collection may be missing from it.
+"""
+
+import math
+
+import pandas as pd
+
+DEFAULT_MAX_SHARDS = 1
+DEFAULT_SHARD_SIZE = 2000
+SEARCH_LIMIT = 1000
+SECOND = pd.Timedelta(seconds=1)
+
+_MAX_SHARDS = DEFAULT_MAX_SHARDS
+_SHARD_SIZE = DEFAULT_SHARD_SIZE
+
+
+def configure(max_shards=DEFAULT_MAX_SHARDS, shard_size=DEFAULT_SHARD_SIZE):
+    """Configure how the collections are sharded.
+
+    Args:
+        max_shards (int):
+            Maximum number of shards fetched in parallel for a single
+            collection. If 1, collections are never sharded. Stargazers are
+            split in two shards at most. Defaults to 1.
+        shard_size (int):
+            Number of elements of a collection per shard. Collections smaller
+            than this are fetched with a single cursor. Defaults to 2000.
+    """
+    global _MAX_SHARDS, _SHARD_SIZE
+
+    _MAX_SHARDS = max_shards
+    _SHARD_SIZE = shard_size
+
+
+def get_shard_count(total):
+    """Get the number of shards in which a collection of the given size is split.
+
+    Args:
+        total (int):
+            Number of elements of the collection.
+
+    Returns:
+        int:
+            Number of shards, which is 1 if the collection must not be sharded.
+    """
+    return max(1, min(_MAX_SHARDS, math.ceil(total / _SHARD_SIZE)))
+
+
+def split_window(start, end, parts):
+    """Split the given time window into consecutive windows of the same length.
+
+    Windows include both ends and are rounded to whole seconds, so that they
+    can be used in the ``created:{start}..{end}`` search qualifiers without
+    overlapping each other.
+
+    Args:
+        start (pandas.Timestamp):
+            Start of the window.
+        end (pandas.Timestamp):
+            End of the window.
+        parts (int):
+            Number of windows to make.
+
+    Returns:
+        list[tuple[pandas.Timestamp, pandas.Timestamp]]:
+            Start and end of each window.
+    """
+    start = start.floor('s')
+    end = end.ceil('s')
+    step = (end - start) / parts
+    starts = sorted({(start + step * index).floor('s') for index in range(parts)})
+    ends = [next_start - SECOND for next_start in starts[1:]] + [end]
+    return list(zip(starts, ends))
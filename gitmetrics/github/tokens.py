@@ -0,0 +1,74 @@
+"""Pool of GitHub tokens with automatic rotation."""
+
+import hashlib
+import logging
+import threading
+
+from gitmetrics.github.rate_limit import get_budget
+
+LOGGER = logging.getLogger(__name__)
+
+
+class TokenPool:
+    """Pool of GitHub tokens that routes each request to the least used token.
+
+    Every request is sent with the token that has the most points remaining in
+    its rate limit budget. Tokens whose budget is exhausted are parked until
+    their limit is reset, and the requests only wait when all of them are.
+
+    The ``identity`` of the pool is a hash of its tokens, which can be used
+    to tell apart data fetched with different tokens without storing them.
+
+    Args:
+        tokens (str or list[str]):
+            Token or list of tokens to use.
+        resource (str):
+            GitHub API resource that the tokens are used for, ``graphql`` or
+            ``core`` for the REST API. Defaults to ``graphql``.
+    """
+
+    def __init__(self, tokens, resource='graphql'):
+        if isinstance(tokens, str):
+            tokens = [tokens]
+
+        if not tokens:
+            raise ValueError('At least one GitHub token must be given')
+
+        self.tokens = list(tokens)
+        self.resource = resource
+        self.identity = hashlib.sha256('\n'.join(sorted(self.tokens)).encode()).hexdigest()
+        self._budgets = [get_budget(token, resource) for token in self.tokens]
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_tokens(cls, tokens, resource='graphql'):
+        """Build a pool from the given tokens, or return them if they already are a pool."""
+        if isinstance(tokens, cls):
+            return tokens
+
+        return cls(tokens, resource)
+
+    def _select(self):
+        available = [budget.get_available() for budget in self._budgets]
+        active = [index for index, points in enumerate(available) if points is not None]
+        if active:
+            return max(active, key=available.__getitem__)
+
+        LOGGER.warning('All the %s GitHub tokens are exhausted', len(self.tokens))
+        resume_at = [budget.get_resume_at() for budget in self._budgets]
+        return resume_at.index(min(resume_at))
+
+    def acquire(self):
+        """Select the token to send the next request with and wait for its budget.
+
+        Returns:
+            tuple[str, RateLimitBudget]:
+                The selected token and its budget, which must be updated with
+                the rate limit values of the response.
+        """
+        with self._lock:
+            index = self._select()
+
+        budget = self._budgets[index]
+        budget.acquire()
+        return self.tokens[index], budget
@@ -3,7 +3,11 @@
 import logging
 
 import pandas as pd
-import requests
+
+from gitmetrics.github.cache import get_cache
+from gitmetrics.github.retry import get_policy
+from gitmetrics.github.tokens import TokenPool
+from gitmetrics.github.transport import get_session
 
 logging.basicConfig(level=logging.INFO)
 LOGGER = logging.getLogger(__name__)
@@ -15,16 +19,20 @@ class TrafficClient:
     """Client to fetch traffic data (popular referrers & paths) for a given repository.
 
     Args:
-        token (str):
-            GitHub personal access token for authentication.
-        quiet (bool, optional):
-            If True, suppresses output logging. Defaults to False.
+        token (str, list[str] or TokenPool):
+            GitHub personal access token for authentication, or pool of tokens
+            to rotate between. All the tokens must have push access to the
+            repositories, as required by the traffic endpoints.
+        session (requests.Session):
+            Session to send the requests with. Defaults to the shared
+            session of ``gitmetrics.github.transport``.
     """
 
-    def __init__(self, token):
+    def __init__(self, token, session=None):
         self.token = token
+        self.tokens = TokenPool.from_tokens(token, resource='core')
+        self.session = session or get_session()
         self.headers = {
-            'Authorization': f'token {token}',
             'Accept': 'application/vnd.github.v3+json',
         }
 
@@ -47,13 +55,32 @@ class TrafficClient:
                 If the API request fails.
         """
         url = f'{GITHUB_API_URL}/repos/{repo}/traffic/{endpoint}'
+        cache = get_cache()
+        if cache is not None:
+            cache_key = cache.get_key('rest', url, self.tokens.identity)
+            data = cache.get(cache_key)
+            if data is not None:
+                LOGGER.info(f'Using cached {endpoint} data for {repo}.')
+                return data
+
         LOGGER.info(f'Fetching traffic data from: {url}')
 
-        response = requests.get(url, headers=self.headers)
+        def request():
+            token, budget = self.tokens.acquire()
+            headers = dict(self.headers, Authorization=f'token {token}')
+            response = self.session.get(url, headers=headers)
+            budget.update_from_headers(response.headers)
+            return response
+
+        response = get_policy().send(request)
 
         if response.status_code == 200:
             LOGGER.info(f'Successfully retrieved {endpoint} data for {repo}.')
-            return response.json()
+            data = response.json()
+            if cache is not None:
+                cache.set(cache_key, data)
+
+            return data
         else:
             LOGGER.error(f'GitHub API Error ({response.status_code}): {response.json()}')
             raise RuntimeError(f'GitHub API Error ({response.status_code}): {response.json()}')
@@ -0,0 +1,107 @@
+"""Shared HTTP transport used by all the GitHub clients.
+
+A single ``requests.Session`` is kept for the whole process so that every
+request made to the GitHub API reuses the same pool of keep-alive connections
+instead of paying a new TCP and TLS handshake each time.
+"""
+
+import logging
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_HEADERS = {
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive',
+}
+
+_LOCK = threading.Lock()
+_SESSION = None
+_POOL_SIZE = DEFAULT_POOL_SIZE
+
+
+def _make_session(pool_size):
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, pool_block=True)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update(DEFAULT_HEADERS)
+    return session
+
+
+def configure(pool_size=DEFAULT_POOL_SIZE):
+    """Configure the shared transport.
+
+    Any previously created session is closed and a new one is created lazily
+    on the next call to ``get_session``.
+
+    Args:
+        pool_size (int):
+            Maximum number of connections kept open per host. Defaults to 10.
+    """
+    global _SESSION, _POOL_SIZE
+
+    with _LOCK:
+        if _SESSION is not None:
+            _SESSION.close()
+
+        _SESSION = None
+        _POOL_SIZE = pool_size
+
+
+def get_session():
+    """Get the ``requests.Session`` shared by all the clients.
+
+    Returns:
+        requests.Session:
+            The shared session, created on first use.
+    """
+    global _SESSION
+
+    with _LOCK:
+        if _SESSION is None:
+            LOGGER.debug('Creating HTTP session with pool size %s', _POOL_SIZE)
+            _SESSION = _make_session(_POOL_SIZE)
+
+        return _SESSION
+
+
+def get_stats():
+    """Get the connection counters of the shared transport.
+
+    Returns:
+        dict:
+            Number of ``requests`` sent, ``connections_opened`` and
+            ``connections_reused``.
+    """
+    requests_sent = 0
+    connections_opened = 0
+    with _LOCK:
+        if _SESSION is not None:
+            for adapter in set(_SESSION.adapters.values()):
+                pools = adapter.poolmanager.pools
+                for key in pools.keys():
+                    pool = pools[key]
+                    requests_sent += pool.num_requests
+                    connections_opened += pool.num_connections
+
+    return {
+        'requests': requests_sent,
+        'connections_opened': connections_opened,
+        'connections_reused': requests_sent - connections_opened,
+    }
+
+
+def log_stats():
+    """Log the connection counters of the shared transport."""
+    stats = get_stats()
+    LOGGER.info(
+        'HTTP transport: %s requests, %s connections opened, %s reused',
+        stats['requests'],
+        stats['connections_opened'],
+        stats['connections_reused'],
+    )
@@ -39,42 +39,31 @@ USERS = """
     }}
 }}
 """
-USERS_COLUMNS = [
-    'user',
-    'name',
-    'email',
-    'blog',
-    'company',
-    'location',
-    'twitter',
+USERS_FIELDS = {
+    'user': 'node.login',
+    'name': 'node.name',
+    'email': 'node.email',
+    'blog': 'node.websiteUrl',
+    'company': 'node.company',
+    'location': 'node.location',
+    'twitter': 'node.twitterUsername',
+    'user_created_at': 'node.createdAt',
+    'user_updated_at': 'node.updatedAt',
+    'bio': 'node.bio',
+}
+USERS_COLUMNS = list(USERS_FIELDS)
+USERS_DATETIME_COLUMNS = [
     'user_created_at',
     'user_updated_at',
-    'bio',
 ]
 
 
 class UsersClient(GQLClient):
     """GQLClient subclass specialized in user-related queries."""
 
-    @staticmethod
-    def _user_parser(user):
-        node = user['node']
-        return {
-            'user': node['login'],
-            'name': node['name'],
-            'email': node['email'],
-            'blog': node['websiteUrl'],
-            'company': node['company'],
-            'location': node['location'],
-            'twitter': node['twitterUsername'],
-            'user_created_at': to_utc(node['createdAt']),
-            'user_updated_at': to_utc(node['updatedAt']),
-            'bio': node['bio'],
-        }
-
     def get_users(self, usernames):
         """Get the profiles of the indicated usernames."""
-        out = pd.DataFrame()
+        chunks = []
         total = len(usernames)
 
         desc = f'Collecting {total} users'
@@ -89,13 +78,22 @@ class UsersClient(GQLClient):
                 query=USERS,
                 prefix='data.search',
                 total='userCount',
-                item_parser=self._user_parser,
                 pbar=pbar,
                 usernames=usernames_query,
                 columns=USERS_COLUMNS,
+                fields=USERS_FIELDS,
             )
-            out = pd.concat([out, chunk_users], ignore_index=True)
+            chunks.append(chunk_users)
 
         pbar.close()
 
+        if chunks:
+            out = pd.concat(chunks, ignore_index=True)
+        else:
+            out = pd.DataFrame(columns=USERS_COLUMNS)
+
+        for column in USERS_DATETIME_COLUMNS:
+            if column in out:
+                out[column] = to_utc(out[column])
+
         return out.sort_values('user', ignore_index=True)
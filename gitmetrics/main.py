@@ -1,24 +1,57 @@
 """Main script."""
 
+import asyncio
 import datetime
 import logging
+import logging.handlers
+import multiprocessing
 import pathlib
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 
 import pandas as pd
 
+from gitmetrics import drive
 from gitmetrics.constants import METRICS_SHEET_NAME
 from gitmetrics.drive import get_or_create_gdrive_folder
-from gitmetrics.github.repository import RepositoryClient
+from gitmetrics.github import cache, rate_limit, retry, transport
+from gitmetrics.github.async_client import (
+    DEFAULT_CONCURRENCY,
+    AsyncBatchRepositoryClient,
+    AsyncRepositoryClient,
+)
+from gitmetrics.github.batch import BatchRepositoryClient
+from gitmetrics.github.repository import (
+    ISSUES_COLUMNS,
+    PROBE_COLUMNS,
+    PULL_REQUESTS_COLUMNS,
+    STARGAZERS_COLUMNS,
+)
 from gitmetrics.github.repository_owner import RepositoryOwnerClient
 from gitmetrics.github.traffic import TrafficClient
-from gitmetrics.github.users import UsersClient
+from gitmetrics.manifest import make_manifest, save_manifest
 from gitmetrics.metrics import compute_metrics
 from gitmetrics.output import create_spreadsheet, load_spreadsheet
+from gitmetrics.profiles import (
+    DEFAULT_MAX_AGE_DAYS,
+    DEFAULT_MAX_REFRESH,
+    PROFILES_NAME,
+    ProfileStore,
+)
+from gitmetrics.records import ISSUES_KEYS, PULL_REQUESTS_KEYS, STARGAZERS_KEYS, RecordStore
+from gitmetrics.state import State, load_state, load_tables, save_state, save_tables
 
 LOGGER = logging.getLogger(__name__)
 
 GDRIVE_LINK = 'gdrive://'
+DEFAULT_FULL_REFRESH_DAYS = 7
+DEFAULT_UPLOAD_WORKERS = 4
 
+PROFILE_SHEETS = [
+    'Unique Issue Users',
+    'Unique Contributors',
+    'Unique Stargazers',
+]
 USER_COLUMNS = [
     'user',
     'name',
@@ -33,78 +66,464 @@ USER_COLUMNS = [
 ]
 
 
-def _get_repository_data(token, repository, previous=None, quiet=False):
+def _get_issues_since(previous):
+    if not previous:
+        return {}
+
+    issues = previous['issues']
+    dates = issues[['created_at', 'updated_at', 'closed_at']].max(axis=1)
+    return dates.groupby(issues['repository']).max().to_dict()
+
+
+def _get_pull_requests_since(previous):
+    if not previous:
+        return {}
+
+    pull_requests = previous['pull_requests'].dropna(subset='updated_at')
+    return pull_requests.groupby('repository').updated_at.max().to_dict()
+
+
+async def _get_repository_data(
+    token,
+    repository,
+    semaphore,
+    executor,
+    previous=None,
+    quiet=False,
+    since=None,
+    first_pages=None,
+    previous_stargazers=None,
+    pull_requests_since=None,
+):
     LOGGER.info('Getting information for repository %s', repository)
-    repo_client = RepositoryClient(token, repository, quiet)
-    if previous:
-        prev_issues = previous['Issues']
-        prev_issues = prev_issues[prev_issues.repository == repository]
-        max_date = max(
-            prev_issues['created_at'].max(),
-            prev_issues['updated_at'].max(),
-            prev_issues['closed_at'].max(),
-        )
+    repo_client = AsyncRepositoryClient(token, repository, quiet, semaphore, executor)
+    first_pages = first_pages or {}
+    if previous_stargazers is None:
+        get_stargazers = repo_client.get_stargazers(first_page=first_pages.get('stargazers'))
     else:
-        prev_issues = None
-        max_date = None
+        get_stargazers = repo_client.get_new_stargazers(
+            previous_stargazers['starred_at'].max(), first_page=first_pages.get('stargazers')
+        )
 
-    issues = repo_client.get_issues(since=max_date)
-    if issues.empty and prev_issues is not None:
-        issues = prev_issues
+    if pull_requests_since is None:
+        get_pull_requests = repo_client.get_pull_requests(
+            first_page=first_pages.get('pullRequests')
+        )
     else:
-        issues.insert(1, 'repository', repository)
-        if prev_issues is not None and not prev_issues.empty:
-            issues = pd.concat([issues, prev_issues], ignore_index=True)
-            issues = issues.sort_values(['created_at', 'closed_at'])
-            issues = issues.drop_duplicates(['repository', 'number'], keep='last')
+        get_pull_requests = repo_client.get_updated_pull_requests(
+            pull_requests_since, first_page=first_pages.get('pullRequests')
+        )
 
-    pull_requests = repo_client.get_pull_requests()
+    issues, pull_requests, stargazers = await asyncio.gather(
+        repo_client.get_issues(since=since, first_page=first_pages.get('issues')),
+        get_pull_requests,
+        get_stargazers,
+    )
+    issues.insert(1, 'repository', repository)
     pull_requests.insert(1, 'repository', repository)
-
-    stargazers = repo_client.get_stargazers()
     stargazers.insert(1, 'repository', repository)
+    previous = previous or {}
+    if previous.get('issues') is not None:
+        issues = _upsert(previous['issues'], issues, ISSUES_KEYS, 'updated_at')
+
+    if pull_requests_since is not None:
+        prev_pull_requests = previous['pull_requests'][pull_requests.columns]
+        pull_requests = _upsert(prev_pull_requests, pull_requests, PULL_REQUESTS_KEYS, 'updated_at')
+
+    if previous_stargazers is not None:
+        stargazers = _upsert(previous_stargazers, stargazers, STARGAZERS_KEYS)
 
     return issues, pull_requests, stargazers
 
 
-def _get_repositories_list(token, owner, quiet=False):
+def _upsert(previous, new, keys, updated_column=None):
+    if new.empty:
+        # Nothing to merge, so the previous records need not be indexed again
+        return previous.reset_index(drop=True)
+
+    records = RecordStore(previous, keys, updated_column)
+    records.upsert(new)
+    return records.to_frame()
+
+
+def _split_by_repository(previous):
+    """Split the previous issues and pull requests by repository."""
+    if not previous:
+        return {}
+
+    by_repository = {}
+    for table in ('issues', 'pull_requests'):
+        for repository, data in previous[table].groupby('repository', sort=False):
+            by_repository.setdefault(repository, {})[table] = data
+
+    return by_repository
+
+
+def _filter_repositories(by_repository, repositories):
+    return {
+        repository: by_repository[repository]
+        for repository in repositories
+        if repository in by_repository
+    }
+
+
+async def _get_repositories_data(
+    token, repositories, previous, quiet, concurrency, previous_stargazers=None
+):
+    # The previous tables may hold repositories that are not being collected again
+    issues_since = _filter_repositories(_get_issues_since(previous), repositories)
+    pull_requests_since = _filter_repositories(_get_pull_requests_since(previous), repositories)
+    full_pull_requests = [
+        repository for repository in repositories if repository not in pull_requests_since
+    ]
+    previous_stargazers = _filter_repositories(previous_stargazers or {}, repositories)
+    previous_by_repository = _split_by_repository(previous)
+    full_stargazers = [
+        repository for repository in repositories if repository not in previous_stargazers
+    ]
+    semaphore = asyncio.Semaphore(concurrency)
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        batch_client = AsyncBatchRepositoryClient(token, repositories, quiet, semaphore, executor)
+        collections = ['issues', 'pullRequests', 'stargazers']
+        batches = await asyncio.gather(
+            batch_client.get_first_pages('issues', since=issues_since),
+            batch_client.get_first_pages('pullRequests', repositories=full_pull_requests),
+            batch_client.get_first_pages(
+                'pullRequests', repositories=list(pull_requests_since), direction='DESC'
+            ),
+            batch_client.get_first_pages('stargazers', repositories=full_stargazers),
+            batch_client.get_first_pages(
+                'stargazers', repositories=list(previous_stargazers), direction='DESC'
+            ),
+        )
+        issues, pull_requests, updated_pull_requests, stargazers, new_stargazers = batches
+        first_pages = [
+            issues,
+            dict(pull_requests, **updated_pull_requests),
+            dict(stargazers, **new_stargazers),
+        ]
+        tasks = [
+            _get_repository_data(
+                token,
+                repository,
+                semaphore,
+                executor,
+                previous_by_repository.get(repository),
+                quiet,
+                since=issues_since.get(repository),
+                first_pages={
+                    collection: pages.get(repository)
+                    for collection, pages in zip(collections, first_pages)
+                },
+                previous_stargazers=previous_stargazers.get(repository),
+                pull_requests_since=pull_requests_since.get(repository),
+            )
+            for repository in repositories
+        ]
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+
+    return dict(zip(repositories, results))
+
+
+def _with_repository(columns):
+    """Insert the ``repository`` column in the given columns, after the first one."""
+    return columns[:1] + ['repository'] + columns[1:]
+
+
+def _concat(frames):
+    if not frames:
+        return pd.DataFrame()
+
+    # Empty frames have object columns, which would change the dtypes of the others
+    non_empty = [frame for frame in frames if not frame.empty]
+    return pd.concat(non_empty or frames, ignore_index=True)
+
+
+def _get_latest_states(projects, repositories):
+    """Get, for each repository, the project with its most recent full collection of stargazers.
+
+    Args:
+        projects (list[tuple[State, dict]]):
+            State and previous tables of each project.
+
+    Returns:
+        dict[str, tuple[pandas.Timestamp, State, dict]]:
+            Date of the last full collection of the stargazers of each
+            repository, and the state and previous tables in which it is stored.
+    """
+    latest_states = {}
+    for repository in repositories:
+        stored = [
+            (pd.Timestamp(state.get_value(f'stargazers_full/{repository}')), state, previous)
+            for state, previous in projects
+            if previous and state.get_value(f'stargazers_full/{repository}') is not None
+        ]
+        if stored:
+            latest_states[repository] = max(stored, key=lambda entry: entry[0])
+
+    return latest_states
+
+
+def _get_previous_stargazers(latest_states, full_refresh_days, now):
+    """Get the stored stargazers of the repositories that can be collected incrementally.
+
+    Repositories whose last full collection is older than ``full_refresh_days``
+    are collected in full again, so that the stars that were removed are dropped.
+
+    Args:
+        latest_states (dict[str, tuple[pandas.Timestamp, State, dict]]):
+            Date of the last full collection of each repository and where it
+            is stored, as returned by ``_get_latest_states``.
+
+    Returns:
+        tuple[dict, dict]:
+            The stored stargazers of the repositories to collect incrementally,
+            and the date of the last full collection of each one of them.
+    """
+    previous_stargazers = {}
+    last_full = {}
+    for repository, (full_date, _, previous) in latest_states.items():
+        stargazers = previous['stargazers']
+        stargazers = stargazers[stargazers.repository == repository]
+        if stargazers.empty:
+            continue
+
+        stargazers = stargazers.reset_index(drop=True)
+
+        if now - full_date < pd.Timedelta(days=full_refresh_days):
+            previous_stargazers[repository] = stargazers
+            last_full[repository] = full_date.isoformat()
+
+    return previous_stargazers, last_full
+
+
+def _get_probes_dict(probes):
+    probes = probes.set_index('repository')[PROBE_COLUMNS]
+    return {
+        repository: {column: None if pd.isna(value) else value for column, value in probe.items()}
+        for repository, probe in probes.to_dict('index').items()
+    }
+
+
+def _get_repositories_list(token, owner, quiet=False, probes=None):
     owner_client = RepositoryOwnerClient(token, owner, quiet)
     repositories = owner_client.get_repositories()
-    return (owner + '/' + repositories)['repository'].tolist()
+    repositories['repository'] = owner + '/' + repositories['repository']
+    if probes is not None:
+        probes.update(_get_probes_dict(repositories))
 
+    return repositories['repository'].tolist()
 
-def _get_profiles(token, issues, pull_requests, stargazers, previous, quiet):
-    all_users = pd.concat([issues['user'], pull_requests['user']], ignore_index=True)
-    unique_users = all_users.dropna().unique().tolist()
 
-    users = stargazers[USER_COLUMNS].drop_duplicates()
+def _get_all_repositories(token, repositories, quiet=False, owners=None, probes=None):
+    """Expand the owners in the given list into their repositories.
+
+    Args:
+        owners (dict[str, list[str]]):
+            Repositories of the owners already expanded, which is updated
+            with the new ones.
+        probes (dict[str, dict]):
+            If given, it is updated with the probes of the repositories of the
+            owners, which come with their listing.
+    """
+    owners = {} if owners is None else owners
+    all_repositories = []
+    for repository in repositories:
+        if '/' in repository:
+            all_repositories.append(repository)
+        else:
+            if repository not in owners:
+                owners[repository] = _get_repositories_list(token, repository, quiet, probes)
+
+            all_repositories.extend(owners[repository])
+
+    return list(dict.fromkeys(all_repositories))
 
-    if previous:
-        users = pd.concat([users, previous['Unique Issue Users'][USER_COLUMNS]], ignore_index=True)
-        users = pd.concat([users, previous['Unique Contributors'][USER_COLUMNS]], ignore_index=True)
-        users = pd.concat([users, previous['Unique Stargazers'][USER_COLUMNS]], ignore_index=True)
-        users = users.sort_values('user_updated_at').drop_duplicates('user', keep='last')
 
-    known_users = users.user.dropna().unique()
+def _get_tables_from_spreadsheet(output_path):
+    """Get the previous tables of a project from its spreadsheet.
 
-    missing = list(set(unique_users) - set(known_users))
+    Only used when the tables are missing, such as the first run after they
+    were introduced. The stargazers are not included in the spreadsheets, so
+    they are collected in full again.
+    """
+    try:
+        sheets = load_spreadsheet(
+            output_path, sheet_name=['Issues', 'Pull Requests', *PROFILE_SHEETS]
+        )
+    except FileNotFoundError:
+        return None
+
+    profiles = _concat([sheets[sheet][USER_COLUMNS] for sheet in PROFILE_SHEETS])
+    return {
+        'issues': sheets['Issues'][_with_repository(ISSUES_COLUMNS)],
+        'pull_requests': sheets['Pull Requests'][_with_repository(PULL_REQUESTS_COLUMNS)],
+        'stargazers': pd.DataFrame(columns=_with_repository(STARGAZERS_COLUMNS)),
+        'profiles': profiles.drop_duplicates('user', keep='last').reset_index(drop=True),
+    }
+
+
+def _load_previous(output_path, incremental, repositories):
+    """Load the previous tables and state of a project, if incremental.
+
+    Only the rows of the given repositories are loaded from the tables, so the
+    repositories removed from the project are dropped.
+    """
+    if not incremental or not output_path:
+        return None, State()
+
+    previous = load_tables(output_path, repositories)
+    if previous is None:
+        previous = _get_tables_from_spreadsheet(output_path)
+
+    return previous, load_state(output_path)
+
+
+def _merge_previous(all_previous):
+    """Merge the previous issues and pull requests of several projects.
+
+    Repositories shared by several projects keep, for each issue and pull
+    request, the most recently updated version found in any of them.
+    """
+    all_previous = [previous for previous in all_previous if previous]
+    if len(all_previous) <= 1:
+        return all_previous[0] if all_previous else None
+
+    merged = {}
+    for table, keys in (('issues', ISSUES_KEYS), ('pull_requests', PULL_REQUESTS_KEYS)):
+        records = RecordStore(all_previous[0][table], keys, 'updated_at')
+        for previous in all_previous[1:]:
+            records.upsert(previous[table])
+
+        merged[table] = records.to_frame()
+
+    return merged
+
+
+def _get_probes(token, repositories, probes, quiet):
+    """Probe the given repositories that were not probed while listing their owners."""
+    missing = [repository for repository in repositories if repository not in probes]
     if missing:
-        LOGGER.info('Getting %s missing users', len(missing))
-        users_client = UsersClient(token, quiet)
-        missing_users = users_client.get_users(missing)
-        users = pd.concat([users, missing_users], ignore_index=True)
+        LOGGER.info('Probing %s repositories for changes', len(missing))
+        batch_client = BatchRepositoryClient(token, missing, quiet)
+        probes.update(_get_probes_dict(batch_client.get_probes()))
+
+    return probes
+
+
+def _get_unchanged(repositories, previous, latest_states, previous_stargazers, probes):
+    """Get the previous data of the repositories that did not change since the last run.
+
+    A repository is unchanged if its probe is the same one stored along with
+    the stargazers used to collect it incrementally.
+    """
+    if not previous or not probes:
+        return {}
+
+    prev_issues = previous['issues']
+    prev_pull_requests = previous['pull_requests']
+    pull_requests_columns = _with_repository(PULL_REQUESTS_COLUMNS)
+    unchanged = {}
+    for repository in repositories:
+        if repository not in previous_stargazers or probes.get(repository) is None:
+            continue
+
+        _, state, _ = latest_states[repository]
+        if state.get_value(f'probe/{repository}') != probes[repository]:
+            continue
+
+        issues = prev_issues[prev_issues.repository == repository]
+        pull_requests = prev_pull_requests.loc[
+            prev_pull_requests.repository == repository, pull_requests_columns
+        ]
+        unchanged[repository] = (
+            issues.reset_index(drop=True),
+            pull_requests.reset_index(drop=True),
+            previous_stargazers[repository],
+        )
+
+    return unchanged
+
+
+def _collect_repositories(
+    token, repositories, previous, projects, quiet, concurrency, full_refresh_days, now, probes=None
+):
+    """Collect the data of the given repositories from GitHub.
+
+    Repositories whose probe did not change since the last run are not
+    collected again, and their previous data is used instead.
+
+    Args:
+        previous (dict[str, pandas.DataFrame]):
+            Previous issues and pull requests of all the repositories.
+        projects (list[tuple[State, dict]]):
+            State and previous tables of each project, used to find the
+            stored stargazers and probe of each repository.
+
+    Returns:
+        tuple[dict, dict]:
+            The issues, pull requests and stargazers of each repository that
+            could be collected, and the date of the last full collection of its
+            stargazers.
+    """
+    latest_states = _get_latest_states(projects, repositories)
+    previous_stargazers, last_full = _get_previous_stargazers(latest_states, full_refresh_days, now)
+    unchanged = _get_unchanged(repositories, previous, latest_states, previous_stargazers, probes)
+    changed = [repository for repository in repositories if repository not in unchanged]
+    LOGGER.info(
+        'Skipping %s unchanged repositories and collecting new stargazers of %s out of %s',
+        len(unchanged),
+        sum(repository in previous_stargazers for repository in changed),
+        len(changed),
+    )
+    repositories_data = asyncio.run(
+        _get_repositories_data(token, changed, previous, quiet, concurrency, previous_stargazers)
+    )
+    collected = dict(unchanged)
+    for repository, repository_data in repositories_data.items():
+        if isinstance(repository_data, Exception):
+            LOGGER.warning(f'Failed to get repository data: {repository}: {repository_data}')
+            retry.record_failure(repository, repository_data)
+            continue
+
+        collected[repository] = repository_data
+        last_full.setdefault(repository, now.isoformat())
+
+    return collected, last_full
+
+
+def _update_state(state, repositories, repositories_data, last_full, probes=None):
+    probes = probes or {}
+    for repository in repositories:
+        if repository in repositories_data:
+            state.set_value(f'stargazers_full/{repository}', last_full[repository])
+            state.set_value(f'probe/{repository}', probes.get(repository))
+
+    for prefix in ('stargazers_full/', 'probe/'):
+        state.prune(prefix, repositories)
 
-    return users.sort_values('user').reset_index(drop=True)
+
+def _get_profiles(token, issues, pull_requests, stargazers, previous, quiet, profile_store):
+    all_users = pd.concat([issues['user'], pull_requests['user']], ignore_index=True)
+    unique_users = all_users.dropna().unique().tolist()
+
+    # Profiles already known from the collected data are only added if missing
+    profile_store.add(stargazers[USER_COLUMNS])
+    if previous:
+        profile_store.add(previous['profiles'])
+
+    profile_store.refresh(token, unique_users, quiet)
+    return profile_store.get(unique_users + stargazers['user'].tolist())
 
 
 def _get_issues(all_issues, profiles):
-    issues = all_issues.drop_duplicates()
-    issues = issues.merge(profiles, how='left', on='user', suffixes=('', '_DROP'))
+    # Issues are unique by repository and number, and profiles by user
+    issues = all_issues.merge(profiles, how='left', on='user', suffixes=('', '_DROP'))
     return issues.filter(regex='^(?!.*_DROP)').sort_values('created_at')
 
 
 def _get_pull_requests(all_pull_requests, profiles):
-    prs = all_pull_requests.merge(profiles, how='left', on='user').drop_duplicates()
+    prs = all_pull_requests.merge(profiles, how='left', on='user')
     return prs.sort_values('created_at')
 
 
@@ -150,6 +569,102 @@ def _get_stargazers(all_stargazers):
     return stargazers.reset_index().sort_values('starred_at')
 
 
+def _prepare_project(token, repositories_data, previous, quiet, profile_store):
+    """Concatenate the data of the repositories of a project and get the profiles of its users."""
+    all_issues = _concat([data[0] for data in repositories_data.values()])
+    all_pull_requests = _concat([data[1] for data in repositories_data.values()])
+    all_stargazers = _concat([data[2] for data in repositories_data.values()])
+    profiles = _get_profiles(
+        token, all_issues, all_pull_requests, all_stargazers, previous, quiet, profile_store
+    )
+    return all_issues, all_pull_requests, all_stargazers, profiles
+
+
+def _get_tables(all_issues, all_pull_requests, all_stargazers, profiles):
+    return {
+        'issues': all_issues,
+        'pull_requests': all_pull_requests,
+        'stargazers': all_stargazers,
+        'profiles': profiles,
+    }
+
+
+def _make_sheets(all_issues, all_pull_requests, all_stargazers, profiles, add_metrics):
+    issues = _get_issues(all_issues, profiles)
+    pull_requests = _get_pull_requests(all_pull_requests, profiles)
+    users = _get_users(all_issues, profiles)
+    contributors = _get_contributors(pull_requests)
+    stargazers = _get_stargazers(all_stargazers)
+
+    sheets = {
+        'Issues': issues,
+        'Pull Requests': pull_requests,
+        'Unique Issue Users': users,
+        'Unique Contributors': contributors,
+        'Unique Stargazers': stargazers,
+    }
+    if add_metrics:
+        metrics = compute_metrics(issues, pull_requests, users, contributors, stargazers)
+        sheets = dict({METRICS_SHEET_NAME: metrics}, **sheets)
+
+    return sheets
+
+
+class _ProjectFilter(logging.Filter):
+    """Prefix the log messages with the name of the project being processed by this thread."""
+
+    def __init__(self, project):
+        super().__init__()
+        self.project = project
+        self.thread = threading.get_ident()
+
+    def filter(self, record):
+        if record.thread == self.thread and not hasattr(record, 'project'):
+            record.project = self.project
+            record.msg = f'[{self.project}] {record.msg}'
+
+        return True
+
+
+def _init_worker(log_queue, level):
+    """Send the logs of the worker processes to the queue listened by the main one."""
+    logger = logging.getLogger('gitmetrics')
+    logger.handlers = [logging.handlers.QueueHandler(log_queue)]
+    logger.setLevel(level)
+    logger.propagate = False
+
+    # A Google Drive client inherited from the main process must not share its connections
+    drive.configure()
+
+
+def _write_project(name, output_path, project, state, add_metrics, convert):
+    """Make the spreadsheet of a project from its prepared data and store it with its state."""
+    log_filter = _ProjectFilter(name)
+    handlers = logging.getLogger('gitmetrics').handlers or logging.getLogger().handlers
+    for handler in handlers:
+        handler.addFilter(log_filter)
+
+    try:
+        LOGGER.info('Creating the spreadsheet')
+        sheets = _make_sheets(*project, add_metrics)
+        content_hash = create_spreadsheet(output_path, sheets, convert=convert)
+        save_tables(output_path, _get_tables(*project))
+        save_state(output_path, state)
+        save_manifest(output_path, make_manifest(sheets, content_hash))
+    finally:
+        for handler in handlers:
+            handler.removeFilter(log_filter)
+
+    return name
+
+
+def _get_output_path(output_folder, name):
+    if output_folder.startswith(GDRIVE_LINK):
+        return f'{output_folder}/{name}'
+
+    return str(pathlib.Path(output_folder) / name)
+
+
 def collect_project_metrics(
     token,
     repositories,
@@ -157,12 +672,26 @@ def collect_project_metrics(
     quiet=False,
     incremental=True,
     add_metrics=False,
+    concurrency=DEFAULT_CONCURRENCY,
+    full_refresh_days=DEFAULT_FULL_REFRESH_DAYS,
+    profile_store=None,
+    skip_unchanged=True,
+    convert=True,
 ):
     """Pull data from GitHub to create metrics.
 
+    The stargazers of each repository are stored in a state file next to the
+    output spreadsheet. In incremental runs only the stargazers newer than the
+    stored ones are collected, except every ``full_refresh_days``, when all
+    of them are collected again to drop the stars that were removed.
+
+    A manifest with the metrics of the project and the number of rows created
+    in each year is also stored next to the spreadsheet, so that ``summarize``
+    and ``consolidate`` do not need to parse the spreadsheet.
+
     Args:
-        token (str):
-            GitHub token to use.
+        token (str or list[str]):
+            GitHub token to use, or list of tokens to rotate between.
         repositories (list[str]):
             List of repositories to analyze, passed as ``{org_name}/{repo_name}``
         output_path (str):
@@ -175,76 +704,126 @@ def collect_project_metrics(
             scratch (False). Defatuls to True.
         add_metrics (bool):
             Whether to add the metrics tab. Defaults to False.
+        concurrency (int):
+            Maximum number of collections fetched from GitHub at the same
+            time. Defaults to 8.
+        full_refresh_days (float):
+            Number of days after which the stargazers of a repository are
+            collected in full again. Defaults to 7.
+        profile_store (ProfileStore):
+            Store of the user profiles, usually shared by all the projects.
+            If not given, a new empty one is used.
+        skip_unchanged (bool):
+            Whether to probe the repositories for changes and skip collecting
+            the ones that did not change since the last run. Defaults to True.
+        convert (bool):
+            Whether to convert the spreadsheet to a Google Sheet when it is
+            stored in Google Drive. Defaults to True.
 
     Returns:
         dict[str, pd.DataFrame] or None:
             If output_path is None, a dict with the sheets is returned.
     """
-    if not incremental:
-        previous = None
-    else:
-        try:
-            previous = load_spreadsheet(output_path, sheet_name=None)
-        except FileNotFoundError:
-            previous = None
-
-    all_issues = pd.DataFrame()
-    all_pull_requests = pd.DataFrame()
-    all_stargazers = pd.DataFrame()
-
-    all_repositories = []
-    for repository in repositories:
-        if '/' in repository:
-            all_repositories.append(repository)
-        else:
-            all_repositories.extend(_get_repositories_list(token, repository, quiet))
-
-    for repository in all_repositories:
-        try:
-            issues, pull_requests, stargazers = _get_repository_data(
-                token=token, repository=repository, previous=previous, quiet=quiet
-            )
-            all_issues = pd.concat([all_issues, issues], ignore_index=True)
-            all_pull_requests = pd.concat([all_pull_requests, pull_requests], ignore_index=True)
-            all_stargazers = pd.concat([all_stargazers, stargazers], ignore_index=True)
-
-        except Exception:
-            LOGGER.info(f'Failed to get repository data: {repository}.')
-
-    profiles = _get_profiles(token, all_issues, all_pull_requests, all_stargazers, previous, quiet)
-
-    issues = _get_issues(all_issues, profiles)
-    pull_requests = _get_pull_requests(all_pull_requests, profiles)
-    users = _get_users(all_issues, profiles)
-    contributors = _get_contributors(pull_requests)
-    stargazers = _get_stargazers(all_stargazers)
-
-    sheets = {
-        'Issues': issues,
-        'Pull Requests': pull_requests,
-        'Unique Issue Users': users,
-        'Unique Contributors': contributors,
-        'Unique Stargazers': stargazers,
-    }
-    if add_metrics:
-        metrics = compute_metrics(issues, pull_requests, users, contributors, stargazers)
-        sheets = dict({METRICS_SHEET_NAME: metrics}, **sheets)
-
+    probes = {} if skip_unchanged else None
+    all_repositories = _get_all_repositories(token, repositories, quiet, probes=probes)
+    previous, state = _load_previous(output_path, incremental, all_repositories)
+    if skip_unchanged:
+        _get_probes(token, all_repositories, probes, quiet)
+
+    now = pd.Timestamp.now(tz='UTC').tz_localize(None)
+    repositories_data, last_full = _collect_repositories(
+        token,
+        all_repositories,
+        previous,
+        [(state, previous)],
+        quiet,
+        concurrency,
+        full_refresh_days,
+        now,
+        probes,
+    )
+    _update_state(state, all_repositories, repositories_data, last_full, probes)
+
+    if profile_store is None:
+        profile_store = ProfileStore()
+
+    project = _prepare_project(token, repositories_data, previous, quiet, profile_store)
+    sheets = _make_sheets(*project, add_metrics)
     if output_path:
-        create_spreadsheet(output_path, sheets)
+        content_hash = create_spreadsheet(output_path, sheets, convert=convert)
+        save_tables(output_path, _get_tables(*project))
+        save_state(output_path, state)
+        save_manifest(output_path, make_manifest(sheets, content_hash))
         return None
 
     return sheets
 
 
+def _write_projects(jobs, workers):
+    """Write the spreadsheets of the projects in a pool of worker processes."""
+    root_logger = logging.getLogger()
+    level = logging.getLogger('gitmetrics').getEffectiveLevel()
+    with multiprocessing.Manager() as manager:
+        log_queue = manager.Queue()
+        listener = logging.handlers.QueueListener(
+            log_queue, *root_logger.handlers, respect_handler_level=True
+        )
+        listener.start()
+        try:
+            with ProcessPoolExecutor(
+                max_workers=min(workers, len(jobs)),
+                initializer=_init_worker,
+                initargs=(log_queue, level),
+            ) as executor:
+                futures = [executor.submit(_write_project, *job) for job in jobs]
+                for future in as_completed(futures):
+                    LOGGER.info('Project %s written', future.result())
+        finally:
+            listener.stop()
+
+
+def _upload_projects(jobs, upload_workers):
+    """Write the projects in a pool of threads, so that their uploads to Google Drive overlap."""
+    with ThreadPoolExecutor(max_workers=min(upload_workers, len(jobs))) as executor:
+        futures = [executor.submit(_write_project, *job) for job in jobs]
+        for future in as_completed(futures):
+            LOGGER.info('Project %s written', future.result())
+
+
 def collect_projects(
-    token, projects, output_folder, quiet=False, incremental=True, add_metrics=False
+    token,
+    projects,
+    output_folder,
+    quiet=False,
+    incremental=True,
+    add_metrics=False,
+    concurrency=DEFAULT_CONCURRENCY,
+    full_refresh_days=DEFAULT_FULL_REFRESH_DAYS,
+    profile_max_age_days=DEFAULT_MAX_AGE_DAYS,
+    profile_max_refresh=DEFAULT_MAX_REFRESH,
+    skip_unchanged=True,
+    workers=1,
+    upload_workers=DEFAULT_UPLOAD_WORKERS,
+    convert=True,
 ):
     """Collect github metrics for multiple projects.
 
+    Repositories that belong to several projects, either directly or through
+    their owner, are only collected once, and the spreadsheet of each project
+    is then made from the shared results. The spreadsheets of the projects,
+    whose making is CPU bound, can be written in parallel by a pool of
+    ``workers`` processes, starting with the largest projects. All the
+    requests to GitHub are made by the main process, so the workers do not
+    spend any of the API budget. When the output folder is in Google Drive and
+    a single process is used, the projects are written by a pool of
+    ``upload_workers`` threads instead, so that their uploads overlap.
+
+    The user profiles are kept in a store shared by all the projects, which is
+    saved in the output folder so that it can be reused by the next runs.
+
     Args:
-        token (str):
-            GitHub token to use.
+        token (str or list[str]):
+            GitHub token to use, or list of tokens to rotate between.
         projects (dict[str, List[str]]):
             Projects to collect, passed as a dict of project names
             and lists of repositories.
@@ -257,25 +836,108 @@ def collect_projects(
             scratch (False). Defatuls to True.
         add_metrics (bool):
             Whether to add the metrics tab. Defaults to False.
+        concurrency (int):
+            Maximum number of collections fetched from GitHub at the same
+            time. Defaults to 8.
+        full_refresh_days (float):
+            Number of days after which the stargazers of a repository are
+            collected in full again. Defaults to 7.
+        profile_max_age_days (float):
+            Number of days after which a user profile is fetched again.
+            Defaults to 30.
+        profile_max_refresh (int):
+            Maximum number of stale user profiles fetched again per project.
+            Defaults to 1000.
+        skip_unchanged (bool):
+            Whether to probe the repositories for changes and skip collecting
+            the ones that did not change since the last run. Defaults to True.
+        workers (int):
+            Number of processes used to write the spreadsheets of the projects.
+            Defaults to 1, which writes them in the main process.
+        upload_workers (int):
+            Number of threads used to write the projects to Google Drive when
+            a single process is used. Defaults to 4.
+        convert (bool):
+            Whether to convert the spreadsheets to Google Sheets when they are
+            stored in Google Drive. Defaults to True.
     """
     if not projects:
         raise ValueError('No projects have been passed')
 
+    profiles_path = _get_output_path(output_folder, PROFILES_NAME)
+    if incremental:
+        profile_store = ProfileStore.load(profiles_path, profile_max_age_days, profile_max_refresh)
+    else:
+        profile_store = ProfileStore(None, profile_max_age_days, profile_max_refresh)
+
+    owners = {}
+    probes = {} if skip_unchanged else None
+    plans = {}
     for project, repositories in projects.items():
-        if output_folder.startswith(GDRIVE_LINK):
-            project_path = f'{output_folder}/{project}'
-        else:
-            project_path = str(pathlib.Path(output_folder) / project)
+        project_path = _get_output_path(output_folder, project)
+        repositories = _get_all_repositories(token, repositories, quiet, owners, probes)
+        previous, state = _load_previous(project_path, incremental, repositories)
+        plans[project] = (project_path, previous, state, repositories)
+
+    all_repositories = list(
+        dict.fromkeys(
+            repository for *_, repositories in plans.values() for repository in repositories
+        )
+    )
+    LOGGER.info(
+        'Collecting %s unique repositories for %s projects', len(all_repositories), len(plans)
+    )
+    if skip_unchanged:
+        _get_probes(token, all_repositories, probes, quiet)
+
+    now = pd.Timestamp.now(tz='UTC').tz_localize(None)
+    repositories_data, last_full = _collect_repositories(
+        token,
+        all_repositories,
+        _merge_previous([previous for _, previous, _, _ in plans.values()]),
+        [(state, previous) for _, previous, state, _ in plans.values()],
+        quiet,
+        concurrency,
+        full_refresh_days,
+        now,
+        probes,
+    )
+
+    jobs = []
+    for name, (project_path, previous, state, repositories) in plans.items():
+        project_data = {
+            repository: repositories_data[repository]
+            for repository in repositories
+            if repository in repositories_data
+        }
+        _update_state(state, repositories, project_data, last_full, probes)
+        project = _prepare_project(token, project_data, previous, quiet, profile_store)
+        jobs.append((name, project_path, project, state, add_metrics, convert))
+
+    # Largest projects first, so that the run is bounded by the largest one
+    jobs.sort(key=lambda job: sum(len(frame) for frame in job[2][:3]), reverse=True)
+    if workers > 1 and len(jobs) > 1:
+        _write_projects(jobs, workers)
+    elif upload_workers > 1 and len(jobs) > 1 and drive.is_drive_path(output_folder):
+        _upload_projects(jobs, upload_workers)
+    else:
+        for job in jobs:
+            _write_project(*job)
 
-        collect_project_metrics(token, repositories, project_path, quiet, incremental, add_metrics)
+    profile_store.save(profiles_path)
+    profile_store.log_stats()
+    transport.log_stats()
+    rate_limit.log_budgets()
+    cache.log_stats()
+    retry.log_stats()
 
 
 def collect_traffic(token, projects, output_folder):
     """Collect github metrics for multiple projects.
 
     Args:
-        token (str):
-            GitHub token to use.
+        token (str or list[str]):
+            GitHub token to use, or list of tokens to rotate between.
         projects (dict[str, List[str]]):
             Projects to collect, passed as a dict of project names
             and lists of repositories.
@@ -295,13 +957,18 @@ def collect_traffic(token, projects, output_folder):
 
             collect_project_traffic(token, repository, repo_path)
 
+    transport.log_stats()
+    rate_limit.log_budgets()
+    cache.log_stats()
+    retry.log_stats()
+
 
 def collect_project_traffic(token, repository, repo_path):
     """Collects traffic data (popular referrers & paths) from GitHub repositories.
 
     Args:
-        token (str):
-            GitHub token for authentication.
+        token (str or list[str]):
+            GitHub token for authentication, or list of tokens to rotate between.
 
         repository (str):
             Repository name such as "owner/repository".
@@ -319,6 +986,8 @@ def collect_project_traffic(token, repository, repo_path):
 
     except Exception as e:
         LOGGER.warning(f'Failed to fetch traffic data for {repository}: {e}')
+        retry.record_failure(repository, e)
+        return None
 
     if repo_path:
         create_spreadsheet(f'{GDRIVE_LINK}{repo_path}', traffic_data)
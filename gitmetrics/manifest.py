@@ -0,0 +1,149 @@
+"""Manifest of precomputed metrics stored next to the output spreadsheet of each project.
+
+The ``summarize`` and ``consolidate`` commands only need a few numbers from
+each spreadsheet: the metrics of the project and the number of rows created
+in each year. These are computed when the spreadsheet is written and stored
+in a small JSON file that lives alongside it, so that those commands do not
+need to parse the whole spreadsheet.
+
+The manifest holds the SHA-256 hash of the spreadsheet it was made for, and
+it is only used while it matches the current spreadsheet. Spreadsheets in
+Google Drive may be converted to Google Sheets, whose content cannot be
+hashed, so in that case the hash of the content last uploaded to them, which
+is stored along with the file, is used instead.
+"""
+
+import json
+import logging
+import pathlib
+
+import pandas as pd
+
+from gitmetrics import drive
+from gitmetrics.constants import METRIC_COLUMN_NAME, METRICS_SHEET_NAME, VALUE_COLUMN_NAME
+from gitmetrics.metrics import compute_metrics
+from gitmetrics.utils import get_content_hash
+
+LOGGER = logging.getLogger(__name__)
+
+MANIFEST_SUFFIX = '.manifest.json'
+MANIFEST_VERSION = 1
+YEARLY_COUNTS = {
+    'Issues': 'created_at',
+    'Pull Requests': 'created_at',
+    'Unique Issue Users': 'first_issue_date',
+    'Unique Contributors': 'first_pr_date',
+    'Unique Stargazers': 'starred_at',
+}
+
+
+def _get_metrics(sheets):
+    metrics = sheets.get(METRICS_SHEET_NAME)
+    if metrics is None:
+        metrics = compute_metrics(
+            sheets['Issues'],
+            sheets['Pull Requests'],
+            sheets['Unique Issue Users'],
+            sheets['Unique Contributors'],
+            sheets['Unique Stargazers'],
+        )
+
+    metrics = metrics[[METRIC_COLUMN_NAME, VALUE_COLUMN_NAME]]
+    return metrics.astype(object).where(metrics.notna(), None).to_dict(orient='records')
+
+
+def make_manifest(sheets, content_hash):
+    """Make the manifest of a spreadsheet.
+
+    Args:
+        sheets (dict[str, pandas.DataFrame]):
+            Sheets of the spreadsheet, as passed to ``create_spreadsheet``.
+        content_hash (str):
+            Hash of the content of the spreadsheet, as returned by
+            ``create_spreadsheet``.
+
+    Returns:
+        dict:
+            The manifest, with the ``metrics`` of the project, the number of
+            ``rows`` of each sheet and the ``yearly_counts`` of rows of each
+            sheet by the year of its date column.
+    """
+    rows = {}
+    yearly_counts = {}
+    for sheet, date_column in YEARLY_COUNTS.items():
+        data = sheets[sheet]
+        rows[sheet] = len(data)
+        counts = pd.to_datetime(data[date_column]).dt.year.value_counts().sort_index()
+        yearly_counts[sheet] = {str(int(year)): int(count) for year, count in counts.items()}
+
+    return {
+        'version': MANIFEST_VERSION,
+        'content_hash': content_hash,
+        'metrics': _get_metrics(sheets),
+        'rows': rows,
+        'yearly_counts': yearly_counts,
+    }
+
+
+def save_manifest(output_path, manifest):
+    """Store the manifest next to the given output spreadsheet.
+
+    Args:
+        output_path (str):
+            Output path of the spreadsheet, as passed to ``create_spreadsheet``.
+        manifest (dict):
+            Manifest to store, as returned by ``make_manifest``.
+    """
+    content = json.dumps(manifest).encode()
+    if drive.is_drive_path(output_path):
+        folder, filename = drive.split_drive_path(output_path)
+        drive.upload_file(content, filename + MANIFEST_SUFFIX, folder)
+    else:
+        path = pathlib.Path(output_path + MANIFEST_SUFFIX)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content)
+
+    LOGGER.info('Saved manifest of %s', output_path)
+
+
+def _is_current(output_path, manifest):
+    try:
+        if drive.is_drive_path(output_path):
+            folder, filename = drive.split_drive_path(output_path)
+            content_hash = drive.get_uploaded_hash(folder, filename)
+        else:
+            content_hash = get_content_hash(pathlib.Path(output_path + '.xlsx').read_bytes())
+    except FileNotFoundError:
+        return False
+
+    return content_hash == manifest['content_hash']
+
+
+def load_manifest(output_path):
+    """Load the manifest stored next to the given output spreadsheet.
+
+    Args:
+        output_path (str):
+            Output path of the spreadsheet, as passed to ``create_spreadsheet``.
+
+    Returns:
+        dict or None:
+            The stored manifest, or None if there is none or it does not
+            match the current spreadsheet.
+    """
+    try:
+        if drive.is_drive_path(output_path):
+            folder, filename = drive.split_drive_path(output_path)
+            content = drive.download_file(folder, filename + MANIFEST_SUFFIX).getvalue()
+        else:
+            content = pathlib.Path(output_path + MANIFEST_SUFFIX).read_bytes()
+    except FileNotFoundError:
+        return None
+
+    manifest = json.loads(content)
+    if manifest.get('version') != MANIFEST_VERSION or not _is_current(output_path, manifest):
+        LOGGER.info('Manifest of %s is outdated', output_path)
+        return None
+
+    LOGGER.info('Loaded manifest of %s', output_path)
+    return manifest
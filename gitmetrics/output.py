@@ -1,15 +1,34 @@
 """Functions to create the output spreadsheet."""
 
+import datetime
+import functools
+import importlib.util
 import io
 import logging
 import pathlib
+import re
+from concurrent.futures import ProcessPoolExecutor
 
+import numpy as np
 import pandas as pd
+import xlsxwriter
 
 from gitmetrics import drive
+from gitmetrics.utils import get_content_hash
 
 LOGGER = logging.getLogger(__name__)
 
+MAX_SHEET_ROWS = 1_048_576
+MAX_SHEET_NAME_LENGTH = 31
+SPLIT_SHEET_PATTERN = re.compile(r'^(.*) \((\d+)\)$')
+WIDTH_SAMPLE_SIZE = 1000
+WRITE_CHUNK_SIZE = 10_000
+DATETIME_FORMAT = 'yyyy-mm-dd hh:mm:ss'
+# calamine is much faster than openpyxl, but optional
+ENGINE = 'calamine' if importlib.util.find_spec('python_calamine') else 'openpyxl'
+# Fixed creation date, so that the same sheets always make the same file
+WORKBOOK_CREATED = datetime.datetime(1980, 1, 1)
+HEADER_FORMAT = {'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'}
 DATE_COLUMNS = [
     'created_at',
     'updated_at',
@@ -20,22 +39,78 @@ DATE_COLUMNS = [
 ]
 
 
-def _add_sheet(writer, data, sheet):
-    data.to_excel(writer, sheet_name=sheet, index=False)
+def _get_column_widths(data, sample_size=WIDTH_SAMPLE_SIZE):
+    """Get the width of each column from the length of the values of a sample of rows.
 
+    The rows are sampled evenly across the table, so that the widths do not
+    depend on the order of the rows while only converting ``sample_size`` of
+    them to strings.
+    """
+    if len(data) > sample_size:
+        positions = np.linspace(0, len(data) - 1, sample_size).round().astype(int)
+        data = data.iloc[positions]
+
+    widths = []
     for column in data:
-        column_length = None
-        if isinstance(column, (int, float)):
-            column_length = len(str(column))
+        values_length = data[column].astype(str).str.len().max() if len(data) else 0
+        widths.append(max(values_length, len(str(column))))
+
+    return widths
+
+
+def _split_sheet(title, data):
+    """Split the sheets that do not fit in an Excel sheet across numbered sheets."""
+    max_rows = MAX_SHEET_ROWS - 1
+    if len(data) <= max_rows:
+        yield title, data
+        return
+
+    for start in range(0, len(data), max_rows):
+        number = start // max_rows + 1
+        if number == 1:
+            yield title, data.iloc[:max_rows]
         else:
-            column_length = len(column)
+            suffix = f' ({number})'
+            yield (
+                title[: MAX_SHEET_NAME_LENGTH - len(suffix)] + suffix,
+                data.iloc[start:][:max_rows],
+            )
+
+
+def _add_sheet(workbook, data, sheet, header_format):
+    worksheet = workbook.add_worksheet(sheet)
+    for column_index, width in enumerate(_get_column_widths(data)):
+        worksheet.set_column(column_index, column_index, width + 2)
+
+    # Rows must be written in order, since completed rows are flushed to disk
+    worksheet.write_row(0, 0, [str(column) for column in data.columns], header_format)
+    # Missing values are converted to None a chunk of rows at a time, so that only one
+    # chunk is copied to objects instead of the whole sheet
+    for start in range(0, len(data), WRITE_CHUNK_SIZE):
+        chunk = data.iloc[start : start + WRITE_CHUNK_SIZE]
+        values = chunk.astype(object).where(chunk.notna(), None)
+        rows = values.itertuples(index=False, name=None)
+        for row_index, row in enumerate(rows, start=start + 1):
+            worksheet.write_row(row_index, 0, row)
 
-        column_width = max(data[column].astype(str).map(len).max(), column_length)
-        col_idx = data.columns.get_loc(column)
-        writer.sheets[sheet].set_column(col_idx, col_idx, column_width + 2)
 
+def _write_workbook(output, sheets):
+    workbook = xlsxwriter.Workbook(
+        output, {'constant_memory': True, 'default_date_format': DATETIME_FORMAT}
+    )
+    workbook.set_properties({'created': WORKBOOK_CREATED})
+    header_format = workbook.add_format(HEADER_FORMAT)
+    for title, data in sheets.items():
+        for sheet, sheet_data in _split_sheet(title, data):
+            if sheet != title:
+                LOGGER.info('Sheet %s does not fit in one sheet, continuing in %s', title, sheet)
 
-def create_spreadsheet(output_path, sheets):
+            _add_sheet(workbook, sheet_data, sheet, header_format)
+
+    workbook.close()
+
+
+def create_spreadsheet(output_path, sheets, convert=True):
     """Create a spreadsheet with the indicated name and data.
 
     If the ``output_path`` variable ends in ``xlsx`` it is interpreted as
@@ -47,46 +122,90 @@ def create_spreadsheet(output_path, sheets):
     The ``sheets`` must be passed as as dictionary that contains sheet
     titles as keys and sheet contents as values, passed as pandas.DataFrames.
 
+    The rows are streamed to the file in constant memory mode, and the width
+    of the columns is computed from a sample of the rows. Sheets with more
+    rows than fit in an Excel sheet continue in numbered sheets, such as
+    ``Issues (2)``.
+
     Args:
         output_path (str or stream):
             Path to where the file must be created, or open stream to write to.
         sheets (dict[str, pandas.DataFrame]):
             Sheets to created, passed as a dict that contains sheet titles as
             keys and sheet contents as values, passed as pandas.DataFrames.
-    """
-    output = io.BytesIO()
-
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:  # pylint: disable=E0110
-        for title, data in sheets.items():
-            _add_sheet(writer, data, title)
+        convert (bool):
+            Whether to convert the spreadsheet to a Google Sheet when it is
+            uploaded to Google Drive. Converting big spreadsheets is slow.
+            Defaults to True.
 
+    Returns:
+        str:
+            SHA-256 hash of the content of the created spreadsheet.
+    """
     if drive.is_drive_path(output_path):
         LOGGER.info('Creating file %s', output_path)
+        output = io.BytesIO()
+        _write_workbook(output, sheets)
         folder, filename = drive.split_drive_path(output_path)
-        drive.upload_spreadsheet(output, filename, folder)
-    else:
-        if not output_path.endswith('.xslx'):
-            output_path += '.xlsx'
+        drive.upload_spreadsheet(output, filename, folder, convert=convert)
+        return get_content_hash(output.getvalue())
 
-        LOGGER.info('Creating file %s', output_path)
-        output_path = pathlib.Path(output_path)
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-        output_path.write_bytes(output.getbuffer())
+    if not output_path.endswith('.xslx'):
+        output_path += '.xlsx'
+
+    LOGGER.info('Creating file %s', output_path)
+    output_path = pathlib.Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    _write_workbook(str(output_path), sheets)
+    return get_content_hash(output_path.read_bytes())
 
 
-def load_spreadsheet(spreadsheet, sheet_name=None):
+def _group_split_sheets(sheet_names):
+    """Group the numbered sheets made by ``_split_sheet`` under the name of their first sheet."""
+    groups = {}
+    for name in sheet_names:
+        # Numbered sheets always follow the previous part of the same sheet
+        match = SPLIT_SHEET_PATTERN.match(name)
+        first = next(reversed(groups), None)
+        if match and first is not None and first.startswith(match.group(1)):
+            groups[first].append(name)
+        else:
+            groups[name] = [name]
+
+    return groups
+
+
+def _parse_dates(sheet):
+    for column in DATE_COLUMNS:
+        # Date cells are already read as naive datetimes, which need no parsing
+        if column in sheet and not pd.api.types.is_datetime64_dtype(sheet[column]):
+            sheet[column] = pd.to_datetime(sheet[column], utc=True).dt.tz_convert(None)
+
+
+def load_spreadsheet(spreadsheet, sheet_name=None, usecols=None):
     """Load a spreadsheet previously created by gitmetrics.
 
+    Only the requested sheets and columns are parsed. Sheets that were split
+    in numbered sheets when written are loaded as a single table. The
+    ``calamine`` engine is used if ``python-calamine`` is installed, since it
+    parses the files much faster than ``openpyxl``.
+
     Args:
         spreadsheet (str or stream):
             Path to where the file is stored, or open stream
             to read from.
+        sheet_name (str or list[str]):
+            Name of the sheet to load, or list of names of the sheets to load.
+            Defaults to all the sheets.
+        usecols (list[str] or dict[str, list[str]]):
+            Columns to load from each sheet, or dict with the columns to load
+            from each one of them. Defaults to all the columns.
 
     Return:
-        dict[str, pd.DataFrame]:
-            Dict of strings and dataframes with the contents
-            of the spreadsheet and the date fields properly
-            parsed to datetimes.
+        pd.DataFrame or dict[str, pd.DataFrame]:
+            If ``sheet_name`` is a string, dataframe with the contents of the
+            sheet. Otherwise, dict of strings and dataframes with the contents
+            of the sheets. The date fields are properly parsed to datetimes.
     """
     if drive.is_drive_path(spreadsheet):
         path = spreadsheet
@@ -96,17 +215,56 @@ def load_spreadsheet(spreadsheet, sheet_name=None):
         spreadsheet += '.xlsx'
         path = spreadsheet
 
-    sheets = pd.read_excel(spreadsheet, sheet_name=sheet_name)
-    if not sheet_name:
-        for sheet in sheets.values():  # noqa
-            for column in DATE_COLUMNS:
-                if column in sheet:
-                    sheet[column] = pd.to_datetime(sheet[column], utc=True).dt.tz_convert(None)
-    else:
-        for column in DATE_COLUMNS:
-            if column in sheets:
-                sheets[column] = pd.to_datetime(sheets[column], utc=True).dt.tz_convert(None)
+    with pd.ExcelFile(spreadsheet, engine=ENGINE) as excel_file:
+        groups = _group_split_sheets(excel_file.sheet_names)
+        if sheet_name is None:
+            sheet_names = list(groups)
+        elif isinstance(sheet_name, str):
+            sheet_names = [sheet_name]
+        else:
+            sheet_names = sheet_name
+
+        sheets = {}
+        for name in sheet_names:
+            columns = usecols.get(name) if isinstance(usecols, dict) else usecols
+            parts = [excel_file.parse(part, usecols=columns) for part in groups.get(name, [name])]
+            sheet = parts[0] if len(parts) == 1 else pd.concat(parts, ignore_index=True)
+            _parse_dates(sheet)
+            sheets[name] = sheet
 
     LOGGER.info('Loaded spreadsheet %s', path)
 
+    if isinstance(sheet_name, str):
+        return sheets[sheet_name]
+
     return sheets
+
+
+def load_spreadsheets(spreadsheets, sheet_name=None, usecols=None, workers=1):
+    """Load several spreadsheets previously created by gitmetrics.
+
+    Args:
+        spreadsheets (list[str]):
+            Paths to where the files are stored.
+        sheet_name (str or list[str]):
+            Sheets to load from each spreadsheet, as in ``load_spreadsheet``.
+        usecols (list[str] or dict[str, list[str]]):
+            Columns to load from each sheet, as in ``load_spreadsheet``.
+        workers (int):
+            Number of processes used to load the spreadsheets in parallel.
+            Defaults to 1, which loads them one after the other.
+
+    Return:
+        dict[str, pd.DataFrame or dict[str, pd.DataFrame]]:
+            Contents of each spreadsheet, as returned by ``load_spreadsheet``,
+            by the path of the spreadsheet.
+    """
+    load = functools.partial(load_spreadsheet, sheet_name=sheet_name, usecols=usecols)
+    if workers <= 1 or len(spreadsheets) <= 1:
+        return {spreadsheet: load(spreadsheet) for spreadsheet in spreadsheets}
+
+    # A Google Drive client inherited from the main process must not share its connections
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(spreadsheets)), initializer=drive.configure
+    ) as executor:
+        return dict(zip(spreadsheets, executor.map(load, spreadsheets)))
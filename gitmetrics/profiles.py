@@ -0,0 +1,201 @@
+"""Store of GitHub user profiles shared across projects and runs.
+
+Profiles are keyed by login together with the date in which they were fetched.
+Profiles taken from other tables, such as the stargazers, have no known fetch
+date and are considered stale. Only the profiles that are missing, or stale,
+are fetched from GitHub, and the stale ones are refreshed in bounded batches so that a
+single run never spends its whole budget on them.
+"""
+
+import logging
+
+import pandas as pd
+
+from gitmetrics.github.users import USERS_COLUMNS, USERS_DATETIME_COLUMNS, UsersClient
+from gitmetrics.records import PROFILES_KEYS, RecordStore
+from gitmetrics.state import load_table, save_table
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_MAX_AGE_DAYS = 30
+DEFAULT_MAX_REFRESH = 1000
+PROFILES_NAME = 'profiles'
+
+
+def _now():
+    # Nanoseconds, like the empty fetch dates, so that merging them keeps the dtype
+    return pd.Timestamp.now(tz='UTC').tz_localize(None).as_unit('ns')
+
+
+def _make_empty_profiles(users):
+    profiles = pd.DataFrame({'user': users}, columns=USERS_COLUMNS)
+    for column in USERS_DATETIME_COLUMNS:
+        profiles[column] = pd.NaT
+
+    return profiles
+
+
+class ProfileStore:
+    """Profiles of the GitHub users, keyed by login.
+
+    Args:
+        profiles (pandas.DataFrame):
+            Stored profiles, with the ``USERS_COLUMNS`` and the ``fetched_at``
+            date of each one. If not given, the store starts empty.
+        max_age_days (float):
+            Number of days after which a profile is considered stale and
+            fetched again. Defaults to 30.
+        max_refresh (int):
+            Maximum number of stale profiles fetched again each time the
+            store is refreshed. The oldest ones, and those with an unknown
+            fetch date, go first. Missing profiles are always fetched.
+            Defaults to 1000.
+    """
+
+    def __init__(
+        self, profiles=None, max_age_days=DEFAULT_MAX_AGE_DAYS, max_refresh=DEFAULT_MAX_REFRESH
+    ):
+        if profiles is None:
+            profiles = pd.DataFrame(columns=USERS_COLUMNS + ['fetched_at'])
+
+        self._records = RecordStore(profiles, PROFILES_KEYS)
+        self.max_age = pd.Timedelta(days=max_age_days)
+        self.max_refresh = max_refresh
+        self.hits = 0
+        self.misses = 0
+        self.refreshed = 0
+
+    def add(self, profiles, fetched_at=None, replace=False):
+        """Add the given profiles to the store.
+
+        Args:
+            profiles (pandas.DataFrame):
+                Profiles to add, with the ``USERS_COLUMNS``.
+            fetched_at (datetime):
+                When the profiles were fetched from GitHub. If not given, the
+                ``fetched_at`` column of the profiles is kept, or left empty if
+                they have none, which makes them stale.
+            replace (bool):
+                Whether to replace the profiles already stored. Defaults to False.
+        """
+        if fetched_at is not None:
+            profiles = profiles.assign(fetched_at=fetched_at)
+        elif 'fetched_at' not in profiles:
+            profiles = profiles.assign(fetched_at=pd.NaT)
+
+        profiles = profiles[USERS_COLUMNS + ['fetched_at']].dropna(subset='user')
+        if replace:
+            self._records.upsert(profiles)
+        else:
+            self._records.insert(profiles)
+
+    def _get_outdated(self, users):
+        """Split the given users in those missing from the store and those stale."""
+        users = pd.Index(users).dropna().unique()
+        stored = self._records.data
+        missing = users[~users.isin(stored.index)]
+        known = users.intersection(stored.index)
+        fetched_at = pd.to_datetime(stored.loc[known, 'fetched_at'])
+        is_fresh = fetched_at >= _now() - self.max_age
+        stale = fetched_at[~is_fresh].sort_values(na_position='first')
+        self.hits += len(fetched_at) - len(stale)
+        self.misses += len(missing) + len(stale)
+        return missing.tolist(), stale.index[: self.max_refresh].tolist()
+
+    def refresh(self, token, users, quiet=False):
+        """Fetch the profiles of the given users that are missing or stale.
+
+        Users that GitHub does not return, such as deleted accounts, are stored
+        with an empty profile so that they are not looked up again until it
+        becomes stale.
+
+        Args:
+            token (str, list[str] or TokenPool):
+                GitHub token to use.
+            users (list[str]):
+                Logins whose profiles are needed.
+            quiet (bool):
+                If True, disable the tqdm bars.
+        """
+        missing, stale = self._get_outdated(users)
+        if stale:
+            LOGGER.info('Refreshing %s stale user profiles', len(stale))
+
+        outdated = missing + stale
+        if not outdated:
+            return
+
+        if missing:
+            LOGGER.info('Getting %s missing users', len(missing))
+
+        fetched_at = _now()
+        fetched = UsersClient(token, quiet).get_users(outdated)
+        self.add(fetched, fetched_at, replace=True)
+        not_found = sorted(set(outdated) - set(fetched['user']))
+        if not_found:
+            self.add(_make_empty_profiles(not_found), fetched_at, replace=True)
+
+        self.refreshed += len(outdated)
+
+    def get(self, users):
+        """Get the stored profiles of the given users.
+
+        Returns:
+            pandas.DataFrame:
+                Table with the ``USERS_COLUMNS``, sorted by user.
+        """
+        users = pd.Index(users).dropna().unique()
+        stored = self._records.data
+        profiles = stored.loc[users.intersection(stored.index), USERS_COLUMNS]
+        return profiles.sort_values('user', ignore_index=True)
+
+    def get_stats(self):
+        """Get the hit rate statistics of the store.
+
+        Returns:
+            dict:
+                Number of ``profiles`` stored, ``hits``, ``misses`` and profiles
+                ``refreshed``, and the ``hit_rate``.
+        """
+        lookups = self.hits + self.misses
+        return {
+            'profiles': len(self._records.data),
+            'hits': self.hits,
+            'misses': self.misses,
+            'refreshed': self.refreshed,
+            'hit_rate': self.hits / lookups if lookups else None,
+        }
+
+    def log_stats(self):
+        """Log the hit rate statistics of the store."""
+        stats = self.get_stats()
+        LOGGER.info(
+            'Profile store: %s profiles, %s hits, %s misses, %s refreshed',
+            stats['profiles'],
+            stats['hits'],
+            stats['misses'],
+            stats['refreshed'],
+        )
+
+    @classmethod
+    def load(cls, path, max_age_days=DEFAULT_MAX_AGE_DAYS, max_refresh=DEFAULT_MAX_REFRESH):
+        """Load the profiles stored at the given path.
+
+        Args:
+            path (str):
+                Path, local or in Google Drive, without the table suffix.
+            max_age_days (float):
+                Number of days after which a profile is considered stale.
+            max_refresh (int):
+                Maximum number of stale profiles fetched again on each refresh.
+
+        Returns:
+            ProfileStore:
+                The stored profiles, or an empty store if there are none.
+        """
+        profiles = load_table(path, PROFILES_NAME)
+        return cls(profiles, max_age_days, max_refresh)
+
+    def save(self, path):
+        """Store the profiles at the given path, local or in Google Drive."""
+        save_table(path, PROFILES_NAME, self._records.to_frame())
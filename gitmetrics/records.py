@@ -0,0 +1,140 @@
+"""Keyed stores of records that are merged incrementally between runs.
+
+Incremental runs merge a few new or updated records into the ones collected
+before. Instead of concatenating both and sorting and deduplicating the whole
+history, the stored records are indexed by their primary key, and each upsert
+only looks up, replaces or appends the records being merged.
+
+Indexing the stored records when the store is created, and building the table
+returned by ``to_frame``, still take time proportional to all of them, so a
+store only saves work over the sort and deduplication of the whole history,
+not over reading it.
+"""
+
+import pandas as pd
+
+ISSUES_KEYS = ['repository', 'number']
+PULL_REQUESTS_KEYS = ['repository', 'number']
+STARGAZERS_KEYS = ['repository', 'user']
+PROFILES_KEYS = ['user']
+
+
+def _make_index(data, keys):
+    # The index levels are unnamed so that they are not mistaken for the key columns
+    if len(keys) == 1:
+        return pd.Index(data[keys[0]], name=None)
+
+    return pd.MultiIndex.from_frame(data[keys], names=[None] * len(keys))
+
+
+class RecordStore:
+    """Records indexed by their primary key.
+
+    Args:
+        data (pandas.DataFrame):
+            Records to start with. If several of them share the same key,
+            the last one is kept.
+        keys (list[str]):
+            Columns that make the primary key of the records.
+        updated_column (str):
+            Column with the date in which each record was last updated. If
+            given, upserted records only replace the stored ones that are not
+            newer than them. Otherwise, upserted records always replace them.
+    """
+
+    def __init__(self, data, keys, updated_column=None):
+        self.keys = keys
+        self.updated_column = updated_column
+        self._data = self._index(data)
+        self._pending = []
+
+    def _index(self, data):
+        if data is None or not set(self.keys).issubset(data.columns):
+            return None
+
+        data = data.reset_index(drop=True)
+        index = _make_index(data, self.keys)
+        duplicated = index.duplicated(keep='last')
+        if duplicated.any():
+            data = data[~duplicated]
+            index = index[~duplicated]
+
+        return data.set_axis(index)
+
+    def _prepare(self, records):
+        """Index the records to merge, keeping the newest version of each one."""
+        if self.updated_column is not None:
+            records = records.sort_values(self.updated_column, kind='stable', na_position='first')
+
+        return self._index(records)
+
+    def _flush(self):
+        if self._pending:
+            self._data = pd.concat([self._data, *self._pending])
+            self._pending = []
+
+    @property
+    def data(self):
+        """Stored records, indexed by their key."""
+        self._flush()
+        return self._data
+
+    def _merge(self, records, replace):
+        records = self._prepare(records)
+        if records is None or records.empty:
+            return
+
+        if self._data is None or self._data.empty:
+            self._data = records.sort_index()
+            return
+
+        self._flush()
+        records = records.reindex(columns=self._data.columns)
+        positions = self._data.index.get_indexer(records.index)
+        found = positions >= 0
+        if replace and found.any():
+            matched = records[found]
+            matched_positions = positions[found]
+            if self.updated_column is not None:
+                stored = self._data[self.updated_column].iloc[matched_positions]
+                is_older = matched[self.updated_column].to_numpy() < stored.to_numpy()
+                matched = matched[~is_older]
+                matched_positions = matched_positions[~is_older]
+
+            for column_index, column in enumerate(self._data.columns):
+                self._data.iloc[matched_positions, column_index] = matched[column].to_numpy()
+
+        if not found.all():
+            self._pending.append(records[~found].sort_index())
+
+    def upsert(self, records):
+        """Insert the given records, replacing the stored ones that have the same key.
+
+        Args:
+            records (pandas.DataFrame):
+                Records to merge, with the same columns as the stored ones.
+        """
+        self._merge(records, replace=True)
+
+    def insert(self, records):
+        """Insert the given records whose key is not stored yet.
+
+        Args:
+            records (pandas.DataFrame):
+                Records to merge, with the same columns as the stored ones.
+        """
+        self._merge(records, replace=False)
+
+    def to_frame(self):
+        """Get the stored records as a table with a default index.
+
+        The records the store was created with keep their order. The records
+        inserted by each later merge, or by the first one if the store was
+        created empty, are appended sorted by their key. Replaced records keep
+        the position of the ones they replaced.
+        """
+        data = self.data
+        if data is None:
+            return pd.DataFrame()
+
+        return data.reset_index(drop=True)
@@ -0,0 +1,258 @@
+"""State kept between runs next to the output spreadsheet of each project.
+
+The raw data collected for each project, which is the source of truth for
+the incremental runs, is stored as one compressed Parquet file per table that
+lives alongside the spreadsheet, either locally or in Google Drive. The rows
+of each table are grouped by repository and month into separate row groups,
+so that reading only some repositories or months skips the rest of the file.
+The spreadsheet is only a presentation of this data and is never read back
+unless the tables are missing. The user profiles shared by all the projects
+are stored the same way, as a single ``profiles`` table.
+
+Small values needed between runs, such as the date of the last full collection
+of the stargazers of each repository, are stored in a separate gzip compressed
+JSON file.
+"""
+
+import gzip
+import io
+import json
+import logging
+import pathlib
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from gitmetrics import drive
+
+LOGGER = logging.getLogger(__name__)
+
+STATE_SUFFIX = '.state.json.gz'
+TABLE_SUFFIX = '.{table}.parquet'
+TABLE_COMPRESSION = 'zstd'
+TABLES = {
+    'issues': 'created_at',
+    'pull_requests': 'created_at',
+    'stargazers': 'starred_at',
+    'profiles': None,
+}
+
+
+class State:
+    """Values stored between runs.
+
+    Args:
+        data (dict):
+            Contents of a previously stored state. If not given, the state
+            starts empty.
+    """
+
+    def __init__(self, data=None):
+        data = data or {}
+        self._values = data.get('values', {})
+
+    def get_value(self, name, default=None):
+        """Get the JSON value stored under the given name."""
+        return self._values.get(name, default)
+
+    def set_value(self, name, value):
+        """Store the given JSON value under the given name."""
+        self._values[name] = value
+
+    def prune(self, prefix, keep):
+        """Remove the values under the prefix whose name is not in ``keep``.
+
+        Args:
+            prefix (str):
+                Prefix of the names to consider, such as ``probe/``.
+            keep (list[str]):
+                Names, without the prefix, to keep.
+        """
+        keep = {prefix + name for name in keep}
+        for name in list(self._values):
+            if name.startswith(prefix) and name not in keep:
+                del self._values[name]
+
+    def to_bytes(self):
+        """Serialize the state as gzip compressed JSON."""
+        content = {'values': self._values}
+        return gzip.compress(json.dumps(content).encode())
+
+    @classmethod
+    def from_bytes(cls, content):
+        """Load a state serialized with ``to_bytes``."""
+        return cls(json.loads(gzip.decompress(content)))
+
+
+def load_state(output_path):
+    """Load the state stored next to the given output spreadsheet.
+
+    Args:
+        output_path (str):
+            Output path of the spreadsheet, as passed to ``create_spreadsheet``.
+
+    Returns:
+        State:
+            The stored state, or an empty one if there is none.
+    """
+    try:
+        if drive.is_drive_path(output_path):
+            folder, filename = drive.split_drive_path(output_path)
+            content = drive.download_file(folder, filename + STATE_SUFFIX).getvalue()
+        else:
+            content = pathlib.Path(output_path + STATE_SUFFIX).read_bytes()
+    except FileNotFoundError:
+        return State()
+
+    LOGGER.info('Loaded state of %s', output_path)
+    return State.from_bytes(content)
+
+
+def save_state(output_path, state):
+    """Store the state next to the given output spreadsheet.
+
+    Args:
+        output_path (str):
+            Output path of the spreadsheet, as passed to ``create_spreadsheet``.
+        state (State):
+            State to store.
+    """
+    content = state.to_bytes()
+    if drive.is_drive_path(output_path):
+        folder, filename = drive.split_drive_path(output_path)
+        drive.upload_file(content, filename + STATE_SUFFIX, folder)
+    else:
+        path = pathlib.Path(output_path + STATE_SUFFIX)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content)
+
+    LOGGER.info('Saved state of %s', output_path)
+
+
+def _to_parquet(data, date_column):
+    """Serialize a table as Parquet, with one row group per repository and month."""
+    output = io.BytesIO()
+    if date_column is None or data.empty:
+        data.to_parquet(output, index=False, compression=TABLE_COMPRESSION)
+        return output.getvalue()
+
+    months = data[date_column].dt.strftime('%Y-%m')
+    data = data.assign(month=months).sort_values(['repository', 'month', date_column])
+    sizes = data.groupby(['repository', 'month'], sort=False, dropna=False).size()
+    table = pa.Table.from_pandas(data.drop(columns='month'), preserve_index=False)
+    with pq.ParquetWriter(output, table.schema, compression=TABLE_COMPRESSION) as writer:
+        offset = 0
+        for size in sizes:
+            writer.write_table(table.slice(offset, size))
+            offset += size
+
+    return output.getvalue()
+
+
+def _get_table_source(output_path, table):
+    if drive.is_drive_path(output_path):
+        folder, filename = drive.split_drive_path(output_path)
+        return drive.download_file(folder, filename + TABLE_SUFFIX.format(table=table))
+
+    path = pathlib.Path(output_path + TABLE_SUFFIX.format(table=table))
+    if not path.exists():
+        raise FileNotFoundError(path)
+
+    return path
+
+
+def load_table(output_path, table):
+    """Load a single table stored next to the given output path.
+
+    Args:
+        output_path (str):
+            Output path, local or in Google Drive, without the table suffix.
+        table (str):
+            Name of the table, one of ``TABLES``.
+
+    Returns:
+        pandas.DataFrame or None:
+            The stored table, or None if it is missing.
+    """
+    try:
+        source = _get_table_source(output_path, table)
+    except FileNotFoundError:
+        return None
+
+    LOGGER.info('Loaded %s table of %s', table, output_path)
+    return pd.read_parquet(source)
+
+
+def load_tables(output_path, repositories=None):
+    """Load the tables stored next to the given output spreadsheet.
+
+    Args:
+        output_path (str):
+            Output path of the spreadsheet, as passed to ``create_spreadsheet``.
+        repositories (list[str]):
+            If given, only load the rows of these repositories, skipping the
+            row groups of the others. Tables without a ``repository`` column
+            are always loaded in full.
+
+    Returns:
+        dict[str, pandas.DataFrame] or None:
+            The stored tables, or None if any of them is missing.
+    """
+    tables = {}
+    for table, date_column in TABLES.items():
+        try:
+            source = _get_table_source(output_path, table)
+        except FileNotFoundError:
+            return None
+
+        filters = None
+        if repositories is not None and date_column is not None:
+            filters = [('repository', 'in', list(repositories))]
+
+        tables[table] = pd.read_parquet(source, filters=filters)
+
+    LOGGER.info('Loaded tables of %s', output_path)
+    return tables
+
+
+def _save_table(output_path, table, data):
+    content = _to_parquet(data, TABLES[table])
+    filename_suffix = TABLE_SUFFIX.format(table=table)
+    if drive.is_drive_path(output_path):
+        folder, filename = drive.split_drive_path(output_path)
+        drive.upload_file(content, filename + filename_suffix, folder)
+    else:
+        path = pathlib.Path(output_path + filename_suffix)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content)
+
+
+def save_table(output_path, table, data):
+    """Store a single table next to the given output path.
+
+    Args:
+        output_path (str):
+            Output path, local or in Google Drive, without the table suffix.
+        table (str):
+            Name of the table, one of ``TABLES``.
+        data (pandas.DataFrame):
+            Table to store.
+    """
+    _save_table(output_path, table, data)
+    LOGGER.info('Saved %s table of %s', table, output_path)
+
+
+def save_tables(output_path, tables):
+    """Store the tables next to the given output spreadsheet.
+
+    Args:
+        output_path (str):
+            Output path of the spreadsheet, as passed to ``create_spreadsheet``.
+        tables (dict[str, pandas.DataFrame]):
+            Tables to store, which must be the ones in ``TABLES``.
+    """
+    for table in TABLES:
+        _save_table(output_path, table, tables[table])
+
+    LOGGER.info('Saved tables of %s', output_path)
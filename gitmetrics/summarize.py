@@ -6,7 +6,8 @@ import os
 import pandas as pd
 
 from gitmetrics.constants import ECOSYSTEM_COLUMN_NAME
-from gitmetrics.output import create_spreadsheet, load_spreadsheet
+from gitmetrics.manifest import load_manifest
+from gitmetrics.output import create_spreadsheet, load_spreadsheets
 from gitmetrics.time_utils import get_current_year, get_dt_now_spelled_out, get_min_max_dt_in_year
 
 dir_path = os.path.dirname(os.path.realpath(__file__))
@@ -18,6 +19,10 @@ TOTAL_COLUMN_NAME = 'Total Since Beginning'
 OUTPUT_FILENAME = 'GitHub_Summary'
 SHEET_NAMES = ['Unique users', 'User issues', 'vendor-mapping', 'metainfo']
 START_YEAR = 2021
+SUMMARY_COLUMNS = {
+    'Unique Issue Users': ['first_issue_date'],
+    'Issues': ['created_at'],
+}
 
 
 def _extract_row(df, date_column):
@@ -30,12 +35,21 @@ def _extract_row(df, date_column):
     return row
 
 
+def _extract_manifest_row(manifest, sheet):
+    yearly_counts = manifest['yearly_counts'][sheet]
+    row = {TOTAL_COLUMN_NAME: [manifest['rows'][sheet]]}
+    for year in range(START_YEAR, get_current_year() + 1):
+        row[year] = [yearly_counts.get(str(year), 0)]
+    return row
+
+
 def summarize_metrics(
     projects,
     vendors,
     input_folder,
     dry_run=False,
     verbose=False,
+    workers=1,
 ):
     """Summarize GitMetrics.
 
@@ -56,7 +70,8 @@ def summarize_metrics(
             The folder must only contain spreadsheet (xlsx) files.
             The name of each file must match the `github_org` (lowercase) in
                 summarize_config.yaml.
-            The GitHub metrics are computed from the xlsx files in this folder.
+            The GitHub metrics are computed from the xlsx files in this folder,
+                or from their manifests if they are up to date.
 
         dry_run (bool):
             Whether of not to actually upload the summary results.
@@ -66,39 +81,54 @@ def summarize_metrics(
             If True, will output the dataframes of the summary metrics
             (one dataframe for each sheet). Defaults to False.
 
+        workers (int):
+            Number of processes used to load the spreadsheets in parallel.
+            Defaults to 1.
+
     """
     vendor_df = pd.DataFrame.from_records(vendors)
     unique_users_df = _create_df()
     users_issues_df = _create_df()
 
     projects.extend(vendors)
+    metrics_filepaths = []
     for project_info in projects:
-        ecosystem_name = project_info['ecosystem']
+        github_org = project_info.get('github_org', project_info['ecosystem'])
+        metrics_filepaths.append(
+            os.path.join(input_folder, github_org.lower()) if github_org else None
+        )
 
-        github_org = project_info.get('github_org', ecosystem_name)
-        if not github_org:
+    # The spreadsheets are only parsed if their manifest is missing or outdated,
+    # and then only the sheets and columns that are summarized
+    manifests = {
+        filepath: load_manifest(filepath)
+        for filepath in dict.fromkeys(metrics_filepaths)
+        if filepath
+    }
+    spreadsheets = load_spreadsheets(
+        [filepath for filepath, manifest in manifests.items() if manifest is None],
+        sheet_name=list(SUMMARY_COLUMNS),
+        usecols=SUMMARY_COLUMNS,
+        workers=workers,
+    )
+    for project_info, metrics_filepath in zip(projects, metrics_filepaths):
+        ecosystem_name = project_info['ecosystem']
+        if not metrics_filepath:
             users_issues_df = append_row(users_issues_df, {ECOSYSTEM_COLUMN_NAME: [ecosystem_name]})
             unique_users_df = append_row(unique_users_df, {ECOSYSTEM_COLUMN_NAME: [ecosystem_name]})
             continue
-        github_org = github_org.lower()
 
-        filename = f'{github_org}'
-        metrics_filepath = os.path.join(input_folder, filename)
-        df = load_spreadsheet(metrics_filepath, sheet_name=None)
+        manifest = manifests[metrics_filepath]
+        if manifest is not None:
+            unique_users_row = _extract_manifest_row(manifest, 'Unique Issue Users')
+            issues_row = _extract_manifest_row(manifest, 'Issues')
+        else:
+            df = spreadsheets[metrics_filepath]
+            unique_users_row = _extract_row(df['Unique Issue Users'], 'first_issue_date')
+            issues_row = _extract_row(df['Issues'], 'created_at')
 
-        unique_issue_users_df = df['Unique Issue Users']
-        unique_users_row = _extract_row(
-            unique_issue_users_df,
-            'first_issue_date',
-        )
         unique_users_row[ECOSYSTEM_COLUMN_NAME] = [ecosystem_name]
         unique_users_df = append_row(unique_users_df, unique_users_row)
-
-        issues_df = df['Issues']
-        issues_row = _extract_row(
-            issues_df,
-            'created_at',
-        )
         issues_row[ECOSYSTEM_COLUMN_NAME] = [ecosystem_name]
         users_issues_df = append_row(users_issues_df, issues_row)
 
@@ -1,12 +1,52 @@
 """Miscellaneous utilities."""
 
+import hashlib
+import re
+
 import pandas as pd
 
+ISO_DATETIME = '%Y-%m-%dT%H:%M:%SZ'
+STRING_LITERAL = re.compile(r'("(?:[^"\\]|\\.)*")')
+
+
+def _to_utc_series(data):
+    try:
+        # Fast path for the fixed format used by GitHub, which is already in UTC
+        return pd.to_datetime(data, format=ISO_DATETIME)
+    except (ValueError, TypeError):
+        return pd.to_datetime(data, utc=True, format='mixed').dt.tz_convert(None)
+
 
 def to_utc(data):
-    """Convert the input data into UTC datetime and make it non-timezone-aware."""
+    """Convert the input data into UTC datetime and make it non-timezone-aware.
+
+    Series are converted in a single vectorized pass, trying first to parse them
+    with the ``%Y-%m-%dT%H:%M:%SZ`` format of the GitHub timestamps and falling
+    back to inferring the format when any of the values does not match it.
+    """
+    if isinstance(data, pd.Series):
+        return _to_utc_series(data)
+
     datetime = pd.to_datetime(data, utc=True)
     if datetime is not None:
         datetime = datetime.tz_convert(None)
 
     return datetime
+
+
+def get_content_hash(content):
+    """Get the SHA-256 hash of the given content, as an hexadecimal string."""
+    return hashlib.sha256(content).hexdigest()
+
+
+def normalize_query(query):
+    """Collapse the whitespace of a GraphQL query, leaving its string literals untouched.
+
+    The same query formatted differently is normalized to the same text, while
+    queries that only differ in the whitespace inside a string, such as a
+    search query, are kept apart.
+    """
+    parts = STRING_LITERAL.split(query)
+    # The odd parts are the string literals captured by the split
+    parts[::2] = [' '.join(part.split()) for part in parts[::2]]
+    return ''.join(parts)
@@ -0,0 +1,95 @@
+import os
+
+from gitmetrics.github import cache
+from gitmetrics.github.cache import ResponseCache
+
+
+def test_get_key_normalizes_whitespace():
+    key = ResponseCache.get_key('{ repository { name } }', 'token')
+    other = ResponseCache.get_key('{\n    repository {\n        name\n    }\n}', 'token')
+
+    assert key == other
+    assert key != ResponseCache.get_key('{ repository { name } }', 'other-token')
+
+
+def test_get_key_keeps_string_whitespace():
+    query = '{{ search(query: "{}", after: "a\\" b") {{ issueCount }} }}'
+    key = ResponseCache.get_key(query.format('repo:org/a  is:issue'), 'token')
+    other = ResponseCache.get_key(query.format('repo:org/a is:issue'), 'token')
+    formatted = ResponseCache.get_key(
+        query.replace(' {{', '\n    {{').format('repo:org/a  is:issue'), 'token'
+    )
+
+    assert key != other
+    assert key == formatted
+
+
+def test_get_set(tmp_path):
+    response_cache = ResponseCache(tmp_path)
+
+    assert response_cache.get('missing') is None
+
+    response_cache.set('key', {'data': {'number': 1}})
+
+    assert response_cache.get('key') == {'data': {'number': 1}}
+    stats = response_cache.get_stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+    assert stats['writes'] == 1
+    assert stats['hit_rate'] == 0.5
+    assert stats['size'] > 0
+
+
+def test_get_expired(tmp_path, monkeypatch):
+    response_cache = ResponseCache(tmp_path, ttl=60)
+    monkeypatch.setattr(cache.time, 'time', lambda: 1000.0)
+    response_cache.set('key', {'data': 1})
+
+    monkeypatch.setattr(cache.time, 'time', lambda: 1060.0)
+    assert response_cache.get('key') == {'data': 1}
+
+    monkeypatch.setattr(cache.time, 'time', lambda: 1061.0)
+    assert response_cache.get('key') is None
+
+
+def test_set_evicts_least_recently_used(tmp_path):
+    response_cache = ResponseCache(tmp_path)
+    for index, key in enumerate(['first', 'second', 'third']):
+        response_cache.set(key, {'data': key})
+        os.utime(response_cache._get_path(key), (index, index))
+
+    # Reading an entry makes it the most recently used one.
+    assert response_cache.get('first') == {'data': 'first'}
+    entry_size = response_cache._get_path('second').stat().st_size
+    response_cache.max_size = entry_size * 3.5
+    response_cache.set('fourth', {'data': 'fourth'})
+
+    assert response_cache.evictions == 1
+    assert response_cache.get('second') is None
+    assert response_cache.get('first') == {'data': 'first'}
+    assert response_cache.get('third') == {'data': 'third'}
+    assert response_cache.get('fourth') == {'data': 'fourth'}
+
+
+def test_size_survives_restart(tmp_path):
+    response_cache = ResponseCache(tmp_path)
+    response_cache.set('key', {'data': 1})
+
+    assert ResponseCache(tmp_path).get_stats()['size'] == response_cache.get_stats()['size']
+
+
+def test_configure():
+    try:
+        cache.configure()
+        assert cache.get_cache() is None
+    finally:
+        cache.configure()
+
+
+def test_configure_directory(tmp_path):
+    try:
+        cache.configure(tmp_path, ttl=10)
+        assert isinstance(cache.get_cache(), ResponseCache)
+        assert cache.get_cache().ttl == 10
+    finally:
+        cache.configure()
@@ -0,0 +1,72 @@
+from gitmetrics.github import checkpoint
+from gitmetrics.github.checkpoint import CheckpointStore
+
+QUERY = '{ repository(owner: "sdv-dev", name: "sdv") { stargazers { totalCount } } }'
+DATA = {'user': ['alice', 'bob'], 'starred_at': ['2024-01-01', '2024-01-02']}
+
+
+def test_get_signature_normalizes_whitespace():
+    signature = CheckpointStore.get_signature(QUERY)
+
+    assert signature == CheckpointStore.get_signature(QUERY.replace(' ', '\n  '))
+    assert signature != CheckpointStore.get_signature(QUERY.replace('sdv"', 'rdt"'))
+    assert signature != CheckpointStore.get_signature(QUERY.replace('"sdv-dev"', '"sdv-dev "'))
+
+
+def test_load_resume(tmp_path):
+    signature = CheckpointStore.get_signature(QUERY)
+    CheckpointStore(tmp_path).save('sdv-dev/sdv/stargazers', signature, 'cursor', 3, DATA)
+
+    state = CheckpointStore(tmp_path, resume=True).load('sdv-dev/sdv/stargazers', signature)
+
+    assert state['end_cursor'] == 'cursor'
+    assert state['pages'] == 3
+    assert state['data'] == DATA
+
+
+def test_load_not_resuming(tmp_path):
+    signature = CheckpointStore.get_signature(QUERY)
+    store = CheckpointStore(tmp_path)
+    store.save('sdv-dev/sdv/stargazers', signature, 'cursor', 3, DATA)
+
+    assert store.load('sdv-dev/sdv/stargazers', signature) is None
+
+
+def test_load_signature_mismatch(tmp_path):
+    store = CheckpointStore(tmp_path, resume=True)
+    store.save('sdv-dev/sdv/stargazers', CheckpointStore.get_signature(QUERY), 'cursor', 3, DATA)
+
+    other_signature = CheckpointStore.get_signature(QUERY.replace('totalCount', 'edges'))
+    assert store.load('sdv-dev/sdv/stargazers', other_signature) is None
+
+
+def test_load_missing_or_corrupt(tmp_path):
+    store = CheckpointStore(tmp_path, resume=True)
+    signature = CheckpointStore.get_signature(QUERY)
+    store._get_path('sdv-dev/sdv/issues').write_bytes(b'not gzip')
+
+    assert store.load('sdv-dev/sdv/stargazers', signature) is None
+    assert store.load('sdv-dev/sdv/issues', signature) is None
+
+
+def test_remove(tmp_path):
+    store = CheckpointStore(tmp_path, resume=True)
+    signature = CheckpointStore.get_signature(QUERY)
+    store.save('sdv-dev/sdv/stargazers', signature, 'cursor', 3, DATA)
+
+    store.remove('sdv-dev/sdv/stargazers')
+    store.remove('sdv-dev/sdv/stargazers')
+
+    assert store.load('sdv-dev/sdv/stargazers', signature) is None
+
+
+def test_configure(tmp_path):
+    try:
+        checkpoint.configure(tmp_path, resume=True, interval=5)
+        store = checkpoint.get_checkpoints()
+        assert store.resume
+        assert store.interval == 5
+    finally:
+        checkpoint.configure()
+
+    assert checkpoint.get_checkpoints() is None
@@ -0,0 +1,105 @@
+import pytest
+import requests
+
+from gitmetrics.github import retry
+from gitmetrics.github.retry import RetryPolicy
+
+
+def _make_response(status_code, headers=None, text=''):
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers or {})
+    response._content = text.encode()
+    return response
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(retry.time, 'sleep', sleeps.append)
+    monkeypatch.setattr(retry, '_RETRIES', retry.collections.Counter())
+    return sleeps
+
+
+@pytest.mark.parametrize(
+    ('response', 'expected'),
+    [
+        (_make_response(200), False),
+        (_make_response(502), True),
+        (_make_response(404), False),
+        (_make_response(403), False),
+        (_make_response(403, {'Retry-After': '10'}), True),
+        (_make_response(429, {'X-RateLimit-Remaining': '0'}), True),
+        (_make_response(403, text='You have exceeded a secondary rate limit.'), True),
+    ],
+)
+def test_is_retryable(response, expected):
+    assert RetryPolicy().is_retryable(response) is expected
+
+
+def test_get_delay_retry_after():
+    response = _make_response(403, {'Retry-After': '30'})
+
+    assert RetryPolicy(max_delay=1).get_delay(1, response) == 30
+
+
+def test_get_delay_ratelimit_reset(monkeypatch):
+    monkeypatch.setattr(retry.time, 'time', lambda: 1000.0)
+    response = _make_response(403, {'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': '1045'})
+
+    assert RetryPolicy().get_delay(1, response) == 46
+
+
+def test_get_delay_ratelimit_reset_passed(monkeypatch):
+    monkeypatch.setattr(retry.time, 'time', lambda: 2000.0)
+    response = _make_response(429, {'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': '1045'})
+
+    assert RetryPolicy().get_delay(1, response) == 1
+
+
+def test_get_delay_secondary_rate_limit():
+    response = _make_response(403, text='secondary rate limit')
+
+    delay = RetryPolicy(base_delay=1).get_delay(1, response)
+
+    assert retry.SECONDARY_RATE_LIMIT_DELAY <= delay <= retry.SECONDARY_RATE_LIMIT_DELAY + 1
+
+
+def test_get_delay_backoff():
+    policy = RetryPolicy(base_delay=1, max_delay=4)
+
+    assert 0 <= policy.get_delay(1, _make_response(502)) <= 1
+    assert 0 <= policy.get_delay(3) <= 4
+    assert 0 <= policy.get_delay(10) <= 4
+
+
+def test_send_retries(sleeps):
+    responses = iter([
+        _make_response(502),
+        _make_response(403, {'Retry-After': '5'}),
+        _make_response(200),
+    ])
+
+    response = RetryPolicy().send(lambda: next(responses))
+
+    assert response.status_code == 200
+    assert len(sleeps) == 2
+    assert sleeps[1] == 5
+    assert retry.get_stats()['retries'] == {502: 1, 403: 1}
+
+
+def test_send_gives_up(sleeps):
+    response = RetryPolicy(max_attempts=3).send(lambda: _make_response(503))
+
+    assert response.status_code == 503
+    assert len(sleeps) == 2
+
+
+def test_send_connection_error(sleeps):
+    def request():
+        raise requests.ConnectionError('reset')
+
+    with pytest.raises(requests.ConnectionError):
+        RetryPolicy(max_attempts=2).send(request)
+
+    assert len(sleeps) == 1
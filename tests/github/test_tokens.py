@@ -0,0 +1,86 @@
+import time
+
+import pytest
+
+from gitmetrics.github import rate_limit
+from gitmetrics.github.tokens import TokenPool
+
+
+@pytest.fixture(autouse=True)
+def budgets(monkeypatch):
+    monkeypatch.setattr(rate_limit, '_BUDGETS', {})
+
+
+def test_init_single_token():
+    pool = TokenPool('token')
+
+    assert pool.tokens == ['token']
+
+
+def test_init_no_tokens():
+    with pytest.raises(ValueError, match='At least one GitHub token'):
+        TokenPool([])
+
+
+def test_identity():
+    pool = TokenPool(['first', 'second'])
+
+    assert pool.identity == TokenPool(['second', 'first']).identity
+    assert pool.identity != TokenPool(['first']).identity
+    assert 'first' not in pool.identity
+
+
+def test_from_tokens():
+    pool = TokenPool(['first', 'second'])
+
+    assert TokenPool.from_tokens(pool) is pool
+    assert TokenPool.from_tokens(['first']).tokens == ['first']
+
+
+def test_acquire_most_remaining():
+    pool = TokenPool(['first', 'second', 'third'])
+    reset_at = time.time() + 3600
+    rate_limit.get_budget('first').update(1000, reset_at)
+    rate_limit.get_budget('second').update(4000, reset_at)
+    rate_limit.get_budget('third').update(2000, reset_at)
+
+    token, budget = pool.acquire()
+
+    assert token == 'second'
+    assert budget is rate_limit.get_budget('second')
+
+
+def test_acquire_skips_exhausted():
+    pool = TokenPool(['first', 'second'])
+    reset_at = time.time() + 3600
+    rate_limit.get_budget('first').exhaust()
+    rate_limit.get_budget('second').update(200, reset_at)
+
+    token, _ = pool.acquire()
+
+    assert token == 'second'
+
+
+def test_acquire_all_exhausted_waits_for_earliest(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(rate_limit.time, 'sleep', sleeps.append)
+    pool = TokenPool(['first', 'second'])
+    now = time.time()
+    rate_limit.get_budget('first').update(0, now + 600)
+    rate_limit.get_budget('second').update(0, now + 60)
+
+    token, _ = pool.acquire()
+
+    assert token == 'second'
+    assert len(sleeps) == 1
+    assert 55 < sleeps[0] <= 62
+
+
+def test_budgets_shared_between_pools():
+    reset_at = time.time() + 3600
+    TokenPool(['first', 'second'])
+    rate_limit.get_budget('first').update(100, reset_at)
+
+    token, _ = TokenPool(['second', 'first']).acquire()
+
+    assert token == 'second'
@@ -0,0 +1,245 @@
+import io
+import itertools
+import threading
+
+import pytest
+
+from gitmetrics import drive
+
+
+class FakeDriveFile(dict):
+    """In-memory stand-in for ``pydrive.files.GoogleDriveFile``."""
+
+    def __init__(self, backend, metadata, auth=None):
+        super().__init__(metadata)
+        self.backend = backend
+        self.auth = auth
+        self.metadata = dict(self)
+        self.content = None
+        self.dirty = {'content': False}
+
+    def Upload(self, param=None):  # noqa: N802
+        if param and param.get('convert'):
+            self['mimeType'] = drive.SPREADSHEET_MIMETYPE
+
+        if 'id' not in self:
+            self['id'] = f'id-{next(self.backend.ids)}'
+            self.setdefault('mimeType', 'application/octet-stream')
+
+        self['alternateLink'] = f'https://drive.google.com/{self["id"]}'
+        self.metadata = dict(self)
+        self.backend.calls['upload'] += 1
+        stored = self.backend.files.setdefault(self['id'], {})
+        stored['metadata'] = dict(self)
+        if self.content is not None:
+            stored['content'] = self.content.getvalue()
+
+    def Trash(self):  # noqa: N802
+        self.backend.calls['trash'] += 1
+        del self.backend.files[self['id']]
+
+    def FetchContent(self, mimetype=None):  # noqa: N802
+        self.backend.calls['download'] += 1
+        self.content = io.BytesIO(self.backend.files[self['id']]['content'])
+
+
+class FakeFileList:
+    """In-memory stand-in for ``pydrive.files.GoogleDriveFileList``."""
+
+    def __init__(self, backend, param):
+        self.backend = backend
+        self.folder = param['q'].split("'")[1]
+
+    def GetList(self):  # noqa: N802
+        self.backend.calls['list'] += 1
+        return [
+            FakeDriveFile(self.backend, stored['metadata'])
+            for stored in self.backend.files.values()
+            if stored['metadata']['parents'][0]['id'] == self.folder
+        ]
+
+
+class FakeDrive:
+    """In-memory stand-in for ``pydrive.drive.GoogleDrive``."""
+
+    def __init__(self):
+        self.auth = object()
+        self.files = {}
+        self.ids = itertools.count()
+        self.calls = dict.fromkeys(['list', 'upload', 'trash', 'download'], 0)
+
+    def CreateFile(self, metadata=None):  # noqa: N802
+        return FakeDriveFile(self, metadata or {}, self.auth)
+
+    def ListFile(self, param=None):  # noqa: N802
+        return FakeFileList(self, param)
+
+    def add(self, metadata, content=None):
+        """Store a file directly in the backend, as if uploaded by an earlier run."""
+        file_id = f'id-{next(self.ids)}'
+        self.files[file_id] = {'metadata': dict(metadata, id=file_id), 'content': content}
+        return file_id
+
+
+@pytest.fixture
+def backend():
+    backend = FakeDrive()
+    drive.configure(backend)
+    yield backend
+    drive.configure()
+
+
+def _get_stored(backend, title):
+    return [stored for stored in backend.files.values() if stored['metadata']['title'] == title]
+
+
+def test_split_drive_path():
+    assert drive.is_drive_path('gdrive://folder/project')
+    assert not drive.is_drive_path('folder/project')
+    assert drive.split_drive_path('gdrive://folder/project') == ('folder', 'project')
+
+
+def test_get_or_create_gdrive_folder_creates(backend):
+    folder_id = drive.get_or_create_gdrive_folder('gdrive://parent', 'folder')
+
+    assert folder_id == drive.get_or_create_gdrive_folder('parent', 'folder')
+    stored = backend.files[folder_id]['metadata']
+    assert stored['title'] == 'folder'
+    assert stored['mimeType'] == drive.FOLDER_MIMETYPE
+    assert stored['parents'] == [{'id': 'parent'}]
+    assert backend.calls['list'] == 1
+    assert backend.calls['upload'] == 1
+
+
+def test_get_or_create_gdrive_folder_existing(backend):
+    folder_id = backend.add({
+        'title': 'folder',
+        'mimeType': drive.FOLDER_MIMETYPE,
+        'parents': [{'id': 'parent'}],
+    })
+
+    assert drive.get_or_create_gdrive_folder('parent', 'folder') == folder_id
+    assert drive.get_or_create_gdrive_folder('parent', 'folder') == folder_id
+    assert backend.calls['list'] == 1
+    assert backend.calls['upload'] == 0
+
+
+def test_get_or_create_gdrive_folder_ignores_files(backend):
+    file_id = backend.add({'title': 'folder', 'mimeType': 'text/plain', 'parents': [{'id': 'p'}]})
+
+    folder_id = drive.get_or_create_gdrive_folder('p', 'folder')
+
+    assert folder_id != file_id
+    assert backend.files[folder_id]['metadata']['mimeType'] == drive.FOLDER_MIMETYPE
+
+
+def test_upload_file_download_file(backend):
+    drive.upload_file(b'content', 'project.state.json.gz', 'folder')
+
+    assert drive.download_file('folder', 'project.state.json.gz').getvalue() == b'content'
+    (stored,) = _get_stored(backend, 'project.state.json.gz')
+    assert stored['content'] == b'content'
+    assert stored['metadata']['parents'] == [{'id': 'folder'}]
+    assert backend.calls['list'] == 1
+
+
+def test_upload_releases_content(backend):
+    drive.upload_file(b'content', 'project.state.json.gz', 'folder')
+
+    indexed = drive._FOLDERS['folder']['project.state.json.gz']
+    assert indexed.content is None
+    assert not indexed.dirty['content']
+
+
+def test_download_file_missing(backend):
+    with pytest.raises(FileNotFoundError):
+        drive.download_file('folder', 'missing')
+
+
+def test_upload_spreadsheet_convert(backend):
+    drive.upload_spreadsheet(io.BytesIO(b'xlsx'), 'project', 'folder')
+    (stored,) = _get_stored(backend, 'project')
+    assert stored['metadata']['mimeType'] == drive.SPREADSHEET_MIMETYPE
+
+    drive.upload_spreadsheet(io.BytesIO(b'xlsx'), 'project', 'folder', convert=False)
+
+    (stored,) = _get_stored(backend, 'project')
+    assert stored['metadata']['mimeType'] != drive.SPREADSHEET_MIMETYPE
+    assert backend.calls['trash'] == 1
+    assert backend.calls['upload'] == 2
+
+
+def test_upload_skips_unchanged_content(backend):
+    drive.upload_file(b'content', 'project.manifest.json', 'folder')
+    drive.upload_file(b'content', 'project.manifest.json', 'folder')
+
+    assert backend.calls['upload'] == 1
+
+    drive.upload_file(b'changed', 'project.manifest.json', 'folder')
+
+    assert backend.calls['upload'] == 2
+    (stored,) = _get_stored(backend, 'project.manifest.json')
+    assert stored['content'] == b'changed'
+
+
+def test_upload_skips_content_uploaded_by_earlier_run(backend):
+    content_hash = drive.get_content_hash(b'content')
+    backend.add(
+        {
+            'title': 'project.manifest.json',
+            'mimeType': 'application/json',
+            'parents': [{'id': 'folder'}],
+            'alternateLink': 'https://drive.google.com/project',
+            'properties': [{'key': drive.CONTENT_HASH_PROPERTY, 'value': content_hash}],
+        },
+        b'content',
+    )
+
+    drive.upload_file(b'content', 'project.manifest.json', 'folder')
+
+    assert backend.calls['upload'] == 0
+    assert drive.get_uploaded_hash('folder', 'project.manifest.json') == content_hash
+
+
+def test_get_uploaded_hash(backend):
+    backend.add({'title': 'other', 'mimeType': 'text/plain', 'parents': [{'id': 'folder'}]})
+    drive.upload_spreadsheet(io.BytesIO(b'xlsx'), 'project', 'folder')
+
+    assert drive.get_uploaded_hash('folder', 'project') == drive.get_content_hash(b'xlsx')
+    assert drive.get_uploaded_hash('folder', 'other') is None
+    with pytest.raises(FileNotFoundError):
+        drive.get_uploaded_hash('folder', 'missing')
+
+
+def test_get_drive_client_per_thread(monkeypatch):
+    authentications = []
+    monkeypatch.setattr(drive, '_authenticate', lambda: authentications.append(1) or 'gauth')
+    monkeypatch.setattr(drive, '_make_client', lambda gauth: FakeDrive())
+    drive.configure()
+
+    clients = {}
+
+    def get_client(name):
+        clients[name] = (drive._get_drive_client(), drive._get_drive_client())
+
+    threads = [threading.Thread(target=get_client, args=(name,)) for name in 'ab']
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    drive.configure()
+    assert clients['a'][0] is clients['a'][1]
+    assert clients['a'][0] is not clients['b'][0]
+    assert len(authentications) == 1
+
+
+def test_find_file_rebinds_auth(backend):
+    drive.upload_file(b'content', 'project.state.json.gz', 'folder')
+    other = FakeDrive()
+    other.files = backend.files
+
+    found_file = drive._find_file(other, 'project.state.json.gz', 'folder')
+
+    assert found_file.auth is other.auth
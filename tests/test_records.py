@@ -0,0 +1,75 @@
+import pandas as pd
+
+from gitmetrics.records import ISSUES_KEYS, STARGAZERS_KEYS, RecordStore
+
+
+def _make_issues(numbers, updated_at, titles):
+    return pd.DataFrame({
+        'repository': 'sdv-dev/sdv',
+        'number': numbers,
+        'title': titles,
+        'updated_at': pd.to_datetime(updated_at),
+    })
+
+
+def test_init_keeps_last_duplicate():
+    data = _make_issues([1, 2, 1], ['2024-01-01'] * 3, ['old', 'other', 'new'])
+
+    frame = RecordStore(data, ISSUES_KEYS).to_frame()
+
+    assert frame['number'].tolist() == [2, 1]
+    assert frame['title'].tolist() == ['other', 'new']
+
+
+def test_init_without_keys():
+    assert RecordStore(None, ISSUES_KEYS).to_frame().empty
+    assert RecordStore(pd.DataFrame(), ISSUES_KEYS).to_frame().empty
+
+
+def test_upsert_last_write_wins():
+    store = RecordStore(_make_issues([3, 1], ['2024-01-01'] * 2, ['a', 'b']), ISSUES_KEYS)
+
+    store.upsert(_make_issues([1, 5, 4], ['2024-01-01'] * 3, ['c', 'd', 'e']))
+    store.upsert(_make_issues([5], ['2024-01-01'], ['f']))
+
+    frame = store.to_frame()
+    assert frame['number'].tolist() == [3, 1, 4, 5]
+    assert frame['title'].tolist() == ['a', 'c', 'e', 'f']
+
+
+def test_upsert_keeps_newer_records():
+    data = _make_issues([1, 2], ['2024-01-05', '2024-01-05'], ['stored', 'stored'])
+    store = RecordStore(data, ISSUES_KEYS, updated_column='updated_at')
+
+    store.upsert(
+        _make_issues(
+            [1, 2, 2],
+            ['2024-01-01', '2024-01-09', '2024-01-07'],
+            ['older', 'newest', 'newer'],
+        )
+    )
+
+    frame = store.to_frame()
+    assert frame['title'].tolist() == ['stored', 'newest']
+    assert frame['updated_at'].tolist() == pd.to_datetime(['2024-01-05', '2024-01-09']).tolist()
+
+
+def test_upsert_into_empty_store():
+    store = RecordStore(None, ISSUES_KEYS)
+
+    store.upsert(_make_issues([2, 1], ['2024-01-01'] * 2, ['a', 'b']))
+
+    assert store.to_frame()['number'].tolist() == [1, 2]
+
+
+def test_insert_does_not_replace():
+    data = pd.DataFrame({'repository': 'sdv-dev/sdv', 'user': ['alice'], 'starred_at': [1]})
+    store = RecordStore(data, STARGAZERS_KEYS)
+
+    store.insert(
+        pd.DataFrame({'repository': 'sdv-dev/sdv', 'user': ['bob', 'alice'], 'starred_at': [2, 3]})
+    )
+
+    frame = store.to_frame()
+    assert frame['user'].tolist() == ['alice', 'bob']
+    assert frame['starred_at'].tolist() == [1, 2]